@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# scenarios run in a fresh headless process each, so main is imported lazily
+BASELINE_PATH = 'bench_baseline.json'
+RESULTS_PATH = 'bench_results.json'
+TOLERANCE = 0.2
+
+SCENARIOS = {}
+
+def scenario(name, frames=600):
+    def register(setup):
+        SCENARIOS[name] = (setup, frames)
+        return setup
+    return register
+
+def keep_alive(m):
+    m.Globals.player.hp = m.Globals.player.max_hp
+
+@scenario('cold_start', frames=60)
+def cold_start(m, game):
+    return None
+
+@scenario('boss_arena')
+def boss_arena(m, game):
+    m.Globals.player.set_pos(m.transform_pos((113, 96)))
+
+    def tick(frame):
+        keep_alive(m)
+    return tick
+
+@scenario('arrows_300')
+def arrows_300(m, game):
+    pos = m.Globals.player.rect.center
+
+    # tops the arrows up to 300 every frame through the game's spawn path, so the cap evicts the oldest and the pool recycles them
+    def tick(frame):
+        for i in range(300 - len(m.Globals.arrows)):
+            m.Lifecycle.spawn('arrows', m.Globals.arrow_pool.acquire(pos, 20 + i % 30, 'right' if i % 2 else 'left', []))
+    return tick
+
+@scenario('items_500')
+def items_500(m, game):
+    pos = m.Globals.player.rect.center
+    # the stacks would merge down to a few dozen items otherwise
+    m.Lifecycle.rules['items'].merge_radius = 0
+    for i in range(500):
+        item = m.Item(m.Usable(m.Globals.player, 'arrow', 1), pos)
+        item.drop(pos)
+        m.Lifecycle.spawn('items', item)
+
+    # the player would pick the items up otherwise
+    m.Globals.player.set_pos(m.transform_pos((20, 7)))
+    return None
+
+@scenario('dispencers')
+def dispencers(m, game):
+    for dispencer in m.Globals.dispencers:
+        dispencer.radius = m.pg.rect.Rect(0, 0, m.Globals.map_pixel_width, m.Globals.map_pixel_height)
+
+    def tick(frame):
+        keep_alive(m)
+    return tick
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, round(q / 100 * (len(values) - 1)))]
+
+def summarize(times):
+    return {
+        'mean': sum(times) / len(times),
+        'p95': percentile(times, 95),
+        'p99': percentile(times, 99),
+    }
+
+def get_peak_memory_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def run_scenario(name, frames=None):
+    os.environ['PLATFORMER_HEADLESS'] = '1'
+    start = time.perf_counter()
+    import main as m
+    game = m.Game(headless=True)
+    setup_ms = (time.perf_counter() - start) * 1000
+
+    setup, default_frames = SCENARIOS[name]
+    frames = default_frames if frames is None else frames
+    tick = setup(m, game)
+
+    update_times = []
+    draw_times = []
+    for frame in range(frames):
+        if tick is not None:
+            tick(frame)
+        game.event()
+        start = time.perf_counter()
+        game.update()
+        middle = time.perf_counter()
+        game.draw()
+        end = time.perf_counter()
+        m.WorldClock.advance()
+        update_times.append((middle - start) * 1000)
+        draw_times.append((end - middle) * 1000)
+
+    return {
+        'frames': frames,
+        'setup_ms': setup_ms,
+        'startup_ms': dict(game.startup.phases),
+        'update_ms': summarize(update_times),
+        'draw_ms': summarize(draw_times),
+        'peak_memory_kb': get_peak_memory_kb(),
+    }
+
+def spawn_scenario(name, frames=None):
+    command = [sys.executable, os.path.abspath(__file__), '--worker', name]
+    if frames is not None:
+        command += ['--frames', str(frames)]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def find_regressions(results, baseline, tolerance=TOLERANCE):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for phase in ('update_ms', 'draw_ms'):
+            for stat in ('mean', 'p95'):
+                old = baseline[name][phase][stat]
+                new = result[phase][stat]
+                if new > old * (1 + tolerance):
+                    regressions.append(f'{name} {phase} {stat}: {old:.3f} -> {new:.3f} ms')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the headless frame-time benchmarks.')
+    parser.add_argument('scenarios', nargs='*', help='scenario names, all by default')
+    parser.add_argument('--frames', type=int, help='frames per scenario')
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='allowed slowdown over the baseline, 0.2 = 20%%')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_scenario(args.worker, args.frames)))
+        return 0
+
+    names = args.scenarios or list(SCENARIOS)
+    for name in names:
+        if name not in SCENARIOS:
+            parser.error(f'unknown scenario {name}, expected one of {", ".join(SCENARIOS)}')
+
+    results = {}
+    for name in names:
+        result = results[name] = spawn_scenario(name, args.frames)
+        print(f"{name:12} update {result['update_ms']['mean']:7.3f} / {result['update_ms']['p95']:7.3f} / {result['update_ms']['p99']:7.3f} ms  "
+              f"draw {result['draw_ms']['mean']:7.3f} / {result['draw_ms']['p95']:7.3f} / {result['draw_ms']['p99']:7.3f} ms  "
+              f"setup {result['setup_ms']:7.1f} ms  peak {result['peak_memory_kb']} KB")
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=4)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=4)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline}, run with --update-baseline to create one')
+        return 1
+
+    with open(args.baseline) as file:
+        regressions = find_regressions(results, json.load(file), args.tolerance)
+    for regression in regressions:
+        print('REGRESSION', regression)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
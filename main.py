@@ -1,10 +1,22 @@
 import pygame as pg
 import random
 import pytmx
+from pytmx.util_pygame import handle_transformation
 import json
-
-pg.init()
-clock = pg.time.Clock()
+import os
+import sys
+import struct
+import time
+import mmap
+import numpy as np
+import xml.etree.ElementTree as ET
+import heapq
+import bisect
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# headless runs simulate the game without a window or audio device
+HEADLESS = '--headless' in sys.argv or os.environ.get('PLATFORMER_HEADLESS') == '1'
 
 SCREEN_WIDTH = 900      #2560
 SCREEN_HEIGHT = 600     #1380
@@ -15,12 +27,49 @@ ITEM_SIZE = 56
 SLOT_SIZE = 64
 SLOT_PADDING = 4
 CAMERA_SPEED = 4
-HOTBAR_SLOT_ACTIVE = pg.image.load('Assets/interface/hotbar_slot_active.png')
-HOTBAR_SLOT_INACTIVE = pg.image.load('Assets/interface/hotbar_slot_inactive.png')
-INVALID_TEXTURE = pg.image.load('Assets/interface/invalid_texture.png') 
+HOTBAR_SLOT_ACTIVE = 'Assets/interface/hotbar_slot_active.png'
+HOTBAR_SLOT_INACTIVE = 'Assets/interface/hotbar_slot_inactive.png'
+INVALID_TEXTURE = 'Assets/interface/invalid_texture.png'
 PLAYER_START_POS = (5*TILE_SIZE*TILE_SCALE, 7*TILE_SIZE*TILE_SCALE)
-
-font = pg.font.Font(None, 36)
+HEADLESS_FRAMES = 3600
+MAP_PATH = 'maps/map.tmx'
+# decoding threads and the main thread time per frame spent installing streamed assets, in ms
+LOADER_WORKERS = 4
+LOADER_FRAME_BUDGET = 2
+# most killed projectiles of each type kept around for reuse
+ARROW_POOL_CAP = 256
+FIREBALL_POOL_CAP = 64
+BULLET_POOL_CAP = 64
+# despawn ttls in ms and most live sprites per group, oldest are evicted first
+ARROW_TTL = 10000
+ARROW_CAP = 256
+ITEM_TTL = 300000
+ITEM_CAP = 500
+ITEM_MERGE_RADIUS = TILE_SIZE*TILE_SCALE
+# every key the game reads from the held-key state, in replay bit order
+RECORDED_KEYS = (pg.K_a, pg.K_d, pg.K_SPACE, pg.K_LEFT, pg.K_RIGHT, pg.K_UP, pg.K_DOWN,
+                 pg.K_0, pg.K_1, pg.K_2, pg.K_3, pg.K_4, pg.K_5, pg.K_6, pg.K_7, pg.K_8, pg.K_9)
+RECORDED_EVENTS = (pg.QUIT, pg.KEYDOWN, pg.MOUSEBUTTONDOWN)
+# key presses turned into named actions, number keys select hotbar slots in this order
+ACTION_KEYS = {pg.K_e: 'inventory', pg.K_m: 'reload map', pg.K_q: 'drop', pg.K_F3: 'profiler'}
+SLOT_KEYS = (pg.K_1, pg.K_2, pg.K_3, pg.K_4, pg.K_5, pg.K_6, pg.K_7, pg.K_8, pg.K_9, pg.K_0)
+
+FONT_SIZE = 36
+SMALL_FONT_SIZE = 20
+
+def init_pygame(headless=HEADLESS):
+    # pygame and the window come up on first use, importing main has no side effects
+    if not pg.get_init():
+        # headless runs simulate the game without a window or audio device
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+        pg.init()
+    screen = pg.display.get_surface()
+    if screen is None:
+        screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pg.display.set_caption("Platformer")
+    return screen
 
 def debug(text):
     i, r = render_text(text, 'red')
@@ -29,7 +78,8 @@ def debug(text):
 def draw_rect(rect):
     pg.draw.rect(Globals.screen, 'red', (rect.x-Globals.camera_x, rect.y-Globals.camera_y, rect.width, rect.height))
 
-def render_text(text, color='black', font=font):
+def render_text(text, color='black', font=None):
+    font = Assets.get_font(FONT_SIZE) if font is None else font
     text_image = font.render(str(text), True, color)
     text_rect = text_image.get_rect()
     return text_image, text_rect
@@ -37,9 +87,243 @@ def render_text(text, color='black', font=font):
 def transform_pos(pos):
     return (pos[0]*TILE_SCALE*TILE_SIZE, pos[1]*TILE_SCALE*TILE_SIZE)
 
+def get_ticks():
+    return WorldClock.source.get_ticks()
+
+def get_arg(name, default=None):
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return default
+
+class KeyState:
+    def __init__(self, keys=()):
+        self.keys = set(keys)
+
+    def __getitem__(self, key):
+        return key in self.keys
+
+class Input:
+    # one snapshot per frame, taken by poll() at the start of Game.event
+    keys = KeyState()
+    mouse_buttons = (False, False, False)
+    mouse_pos = (0, 0)
+    events = []
+
+    # edge-triggered (action, value) pairs of this frame, dispatch() hands them to subscribers
+    actions = []
+    subscribers = {}
+
+    # state queued by set_state replaces the keyboard and mouse, see Game.step
+    injected = None
+    injected_events = []
+
+    recorder = None
+    replay = None
+
+    @classmethod
+    def set_state(cls, keys=(), mouse_buttons=(False, False, False), mouse_pos=(0, 0), events=()):
+        cls.injected = (KeyState(keys), tuple(mouse_buttons), tuple(mouse_pos))
+        cls.injected_events = list(events)
+
+    @classmethod
+    def subscribe(cls, action, callback):
+        cls.subscribers.setdefault(action, []).append(callback)
+
+    @classmethod
+    def clear_subscribers(cls):
+        cls.subscribers = {}
+
+    @classmethod
+    def poll(cls):
+        last_keys, last_mouse_buttons = cls.keys, cls.mouse_buttons
+        cls.read()
+        cls.actions = cls.get_actions(last_keys, last_mouse_buttons)
+
+    @classmethod
+    def read(cls):
+        if cls.replay is not None:
+            frame = cls.replay.read_frame()
+            if frame is not None:
+                ticks, cls.keys, cls.mouse_buttons, cls.mouse_pos, cls.events = frame
+                WorldClock.source.ticks = ticks
+                pg.event.pump()
+                return
+            cls.replay.close()
+            cls.replay = None
+
+        if cls.injected is not None:
+            cls.keys, cls.mouse_buttons, cls.mouse_pos = cls.injected
+            cls.events = cls.injected_events + pg.event.get()
+            cls.injected_events = []
+        else:
+            cls.keys = pg.key.get_pressed()
+            cls.mouse_buttons = pg.mouse.get_pressed()
+            cls.mouse_pos = pg.mouse.get_pos()
+            cls.events = pg.event.get()
+
+        if cls.recorder is not None:
+            cls.recorder.write_frame(get_ticks(), cls.keys, cls.mouse_buttons, cls.mouse_pos, cls.events)
+
+    @classmethod
+    def get_actions(cls, last_keys, last_mouse_buttons):
+        actions = []
+        for event in cls.events:
+            if event.type == pg.QUIT:
+                actions.append(('quit', None))
+            elif event.type == pg.KEYDOWN:
+                actions.append(('key', event.key))
+                if event.key in ACTION_KEYS:
+                    actions.append((ACTION_KEYS[event.key], None))
+            elif event.type == pg.MOUSEBUTTONDOWN:
+                if event.button == 5:
+                    actions.append(('slot next', None))
+                elif event.button == 4:
+                    actions.append(('slot previous', None))
+
+        # presses from the held state, so injected and replayed input behave the same as live input
+        for i, key in enumerate(SLOT_KEYS):
+            if cls.keys[key] and not last_keys[key]:
+                actions.append(('slot', i))
+        if cls.mouse_buttons[0] and not last_mouse_buttons[0]:
+            actions.append(('attack', None))
+            actions.append(('click', cls.mouse_pos))
+        return actions
+
+    @classmethod
+    def dispatch(cls):
+        for action, value in cls.actions:
+            for callback in cls.subscribers.get(action, ()):
+                callback(value)
+
+    @classmethod
+    def stop(cls):
+        if cls.recorder is not None:
+            cls.recorder.close()
+            cls.recorder = None
+        if cls.replay is not None:
+            cls.replay.close()
+            cls.replay = None
+
+    @classmethod
+    def get_keys(cls):
+        return cls.keys
+
+    @classmethod
+    def get_mouse_buttons(cls):
+        return cls.mouse_buttons
+
+    @classmethod
+    def get_mouse_pos(cls):
+        return cls.mouse_pos
+
+    @classmethod
+    def get_events(cls):
+        return cls.events
+
+class InputRecorder:
+    header = struct.Struct('<4sHQd')
+    frame = struct.Struct('<dIBhhB')
+    event = struct.Struct('<Bi')
+    magic = b'PFRP'
+    version = 1
+
+    def __init__(self, path, seed, start_ticks):
+        self.file = open(path, 'wb')
+        self.file.write(self.header.pack(self.magic, self.version, seed, start_ticks))
+
+    def write_frame(self, ticks, keys, mouse_buttons, mouse_pos, events):
+        key_mask = 0
+        for i, key in enumerate(RECORDED_KEYS):
+            if keys[key]:
+                key_mask |= 1 << i
+        mouse_mask = mouse_buttons[0] | mouse_buttons[1] << 1 | mouse_buttons[2] << 2
+        events = [event for event in events if event.type in RECORDED_EVENTS]
+
+        self.file.write(self.frame.pack(ticks, key_mask, mouse_mask, int(mouse_pos[0]), int(mouse_pos[1]), len(events)))
+        for event in events:
+            if event.type == pg.KEYDOWN:
+                value = event.key
+            elif event.type == pg.MOUSEBUTTONDOWN:
+                value = event.button
+            else:
+                value = 0
+            self.file.write(self.event.pack(RECORDED_EVENTS.index(event.type), value))
+
+    def close(self):
+        self.file.close()
+
+class InputReplay:
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        magic, version, self.seed, self.start_ticks = InputRecorder.header.unpack(self.file.read(InputRecorder.header.size))
+        if magic != InputRecorder.magic or version != InputRecorder.version:
+            raise ValueError(f'{path} is not a version {InputRecorder.version} replay')
+        self.frame_num = 0
+
+    def read_frame(self):
+        data = self.file.read(InputRecorder.frame.size)
+        if len(data) < InputRecorder.frame.size:
+            return None
+        ticks, key_mask, mouse_mask, mouse_x, mouse_y, num_events = InputRecorder.frame.unpack(data)
+
+        keys = KeyState(key for i, key in enumerate(RECORDED_KEYS) if key_mask & 1 << i)
+        mouse_buttons = (bool(mouse_mask & 1), bool(mouse_mask & 2), bool(mouse_mask & 4))
+        events = []
+        for i in range(num_events):
+            event_type, value = InputRecorder.event.unpack(self.file.read(InputRecorder.event.size))
+            event_type = RECORDED_EVENTS[event_type]
+            if event_type == pg.KEYDOWN:
+                events.append(pg.event.Event(event_type, key=value))
+            elif event_type == pg.MOUSEBUTTONDOWN:
+                events.append(pg.event.Event(event_type, button=value))
+            else:
+                events.append(pg.event.Event(event_type))
+
+        self.frame_num += 1
+        return ticks, keys, mouse_buttons, (mouse_x, mouse_y), events
+
+    def close(self):
+        self.file.close()
+
+class RealTimeClock:
+    # latched once per frame so every timer in a frame sees the same time
+    def __init__(self):
+        self.ticks = pg.time.get_ticks()
+
+    def get_ticks(self):
+        return self.ticks
+
+    def advance(self, ms=None):
+        self.ticks = pg.time.get_ticks()
+
+class ManualClock:
+    def __init__(self, start=0, timestep=1000/FPS):
+        self.ticks = start
+        self.timestep = timestep
+
+    def get_ticks(self):
+        return self.ticks
+
+    def advance(self, ms=None):
+        self.ticks += self.timestep if ms is None else ms
+
+class WorldClock:
+    # every timer and cooldown reads this, headless runs step it by a fixed timestep
+    source = ManualClock() if HEADLESS else RealTimeClock()
+
+    @classmethod
+    def set_source(cls, source):
+        cls.source = source
+
+    @classmethod
+    def advance(cls, ms=None):
+        cls.source.advance(ms)
+
 class Timer:
     def __init__(self, delay=1000):
-        self.timer = pg.time.get_ticks()
+        self.timer = get_ticks()
         self.delay = delay
     
     def check(self, delay=None):
@@ -49,24 +333,435 @@ class Timer:
             return True
 
     def get_difference(self):
-        return pg.time.get_ticks() - self.timer
+        return get_ticks() - self.timer
     
     def update(self):
-        self.timer = pg.time.get_ticks()
+        self.timer = get_ticks()
 
     def new_delay(self, delay):
         self.delay = delay
 
+class Assets:
+    images = {}
+    sounds = {}
+    animations = {}
+    fonts = {}
+    used = set()
+    # keys preloaded or installed by the loader at startup, evict_unused never drops them
+    pinned = set()
+    hits = 0
+    misses = 0
+
+    # rotated frames are quantized to rotation_step degrees and stop being cached past rotation_budget bytes
+    rotation_step = 2
+    rotation_budget = 8 * 1024 * 1024
+    rotated_bytes = 0
+
+    # loaded before the map so spawns and chest openings never touch the disk
+    manifest = [
+        ('Assets/weapons/arrow.png', (56, 14)),
+        ('Assets/weapons/arrow.png', (56, 14), True),
+        ('Assets/weapons/fireball_sheet.png',),
+        ('Assets/Legacy Adventure Pack - RUINS/Assets/Chest_opened.png', (48, 48)),
+        ('Assets/sounds/arrow.wav',),
+        ('Assets/sounds/damage.wav',),
+        ('Assets/sounds/dblast.wav',),
+    ]
+    rotation_manifest = [
+        ('Assets/weapons/arrow.png', (56, 14), -90, 90),
+        ('Assets/weapons/sword.png', (45, 45), -75, 75, 5),
+    ]
+    # images the world, player and hud are built from, decoded by the loader before the world exists,
+    # one missing here is still loaded on first use, only on the main thread
+    startup_manifest = [
+        'Assets/01 - Hobbit/idle.png',
+        'Assets/01 - Hobbit/jump.png',
+        'Assets/01 - Hobbit/run.png',
+        'Assets/Legacy Adventure Pack - RUINS/Assets/Bottle.png',
+        'Assets/Legacy Adventure Pack - RUINS/Assets/Chest_closed.png',
+        'Assets/Legacy Adventure Pack - RUINS/Assets/dispencer.png',
+        'Assets/Legacy Adventure Pack - RUINS/Assets/effect_plate.png',
+        'Assets/enemies/Orc - Rogue/Death/Death-Sheet.png',
+        'Assets/enemies/Orc - Rogue/Idle/Idle-Sheet.png',
+        'Assets/enemies/Orc - Rogue/Run/Run-Sheet.png',
+        'Assets/enemies/Orc - Shaman/Death/Death-Sheet.png',
+        'Assets/enemies/Orc - Shaman/Idle/Idle-Sheet.png',
+        'Assets/enemies/Orc - Shaman/Run/Run-Sheet.png',
+        'Assets/enemies/Skeleton - Warrior/Death/Death-Sheet.png',
+        'Assets/enemies/Skeleton - Warrior/Idle/Idle-Sheet.png',
+        'Assets/enemies/Skeleton - Warrior/Run/Run-Sheet.png',
+        'Assets/interface/background.png',
+        'Assets/interface/invalid_texture.png',
+        'Assets/interface/slot_active.png',
+        'Assets/interface/slot_inactive.png',
+        'Assets/interface/hotbar_slot_active.png',
+        'Assets/interface/hotbar_slot_inactive.png',
+        'Assets/moneds/Coin.png',
+        'Assets/moneds/MonedaD.png',
+        'Assets/weapons/Bow/idle.png',
+        'Assets/weapons/Bow/pull/pull1.png',
+        'Assets/weapons/Bow/pull/pull2.png',
+        'Assets/weapons/Bow/pull/pull3.png',
+        'Assets/weapons/arrow_icon.png',
+    ]
+
+    @classmethod
+    def get_image(cls, path: str, size: tuple | list=None, flip: bool=False, rotation: int=0):
+        key = (path, tuple(size) if size is not None else None, flip, rotation)
+        cls.used.add(key)
+        image = cls.images.get(key)
+        if image is not None:
+            cls.hits += 1
+            return image
+        cls.misses += 1
+
+        if rotation:
+            image = pg.transform.rotate(cls.get_image(path, size, flip), rotation)
+            cls.rotated_bytes += image.get_width() * image.get_height() * image.get_bytesize()
+        elif flip:
+            image = pg.transform.flip(cls.get_image(path, size), True, False)
+        elif size is not None:
+            image = pg.transform.scale(cls.get_image(path), size)
+        else:
+            image = pg.image.load(path)
+            if pg.display.get_surface() is not None:
+                image = image.convert_alpha()
+        cls.images[key] = image
+        return image
+
+    @classmethod
+    def add_image(cls, path: str, image, pin: bool=False):
+        # a decoded image from the loader, a copy already loaded on first use is kept
+        key = (path, None, False, 0)
+        if pin:
+            cls.pinned.add(key)
+        if key not in cls.images:
+            if pg.display.get_surface() is not None:
+                image = image.convert_alpha()
+            cls.images[key] = image
+
+    @classmethod
+    def get_rotated(cls, path: str, size: tuple | list=None, flip: bool=False, angle: float=0, step: int=None):
+        step = cls.rotation_step if step is None else step
+        angle = round(angle / step) * step
+        key = (path, tuple(size) if size is not None else None, flip, angle)
+        if key not in cls.images and cls.rotated_bytes >= cls.rotation_budget:
+            return pg.transform.rotate(cls.get_image(path, size, flip), angle)
+        return cls.get_image(path, size, flip, angle)
+
+    @classmethod
+    def get_sound(cls, path: str, volume: float=0.1):
+        key = (path, volume)
+        cls.used.add(key)
+        sound = cls.sounds.get(key)
+        if sound is not None:
+            cls.hits += 1
+            return sound
+        cls.misses += 1
+
+        sound = pg.mixer.Sound(path)
+        sound.set_volume(volume)
+        cls.sounds[key] = sound
+        return sound
+
+    @classmethod
+    def add_sound(cls, path: str, sound, volume: float=0.1, pin: bool=False):
+        key = (path, volume)
+        if pin:
+            cls.pinned.add(key)
+        if key not in cls.sounds:
+            sound.set_volume(volume)
+            cls.sounds[key] = sound
+
+    @classmethod
+    def get_font(cls, size: int):
+        font = cls.fonts.get(size)
+        if font is None:
+            font = cls.fonts[size] = pg.font.Font(None, size)
+        return font
+
+    @classmethod
+    def get_animation(cls, key: tuple, build):
+        # frame lists are shared by every sprite using the same spec and must not be modified
+        cls.used.add(key)
+        animation = cls.animations.get(key)
+        if animation is not None:
+            cls.hits += 1
+            return animation
+        cls.misses += 1
+
+        animation = build()
+        cls.animations[key] = animation
+        return animation
+
+    @classmethod
+    def preload(cls, manifest: list=None):
+        used, cls.used = cls.used, set()
+        for entry in cls.manifest if manifest is None else manifest:
+            if entry[0].endswith('.wav'):
+                cls.get_sound(*entry)
+            else:
+                cls.get_image(*entry)
+        cls.pin(used)
+
+    @classmethod
+    def preload_rotations(cls, manifest: list=None):
+        used, cls.used = cls.used, set()
+        for path, size, start, stop, *step in cls.rotation_manifest if manifest is None else manifest:
+            step = step[0] if step else cls.rotation_step
+            for angle in range(start, stop + 1, step):
+                cls.get_rotated(path, size, False, angle, step)
+                cls.get_rotated(path, size, True, angle, step)
+        cls.pin(used)
+
+    @classmethod
+    def pin(cls, used):
+        # every key touched since used was swapped out, scaled and flipped sources included
+        cls.pinned |= cls.used
+        cls.used |= used
+
+    @classmethod
+    def evict_unused(cls):
+        for key in [key for key in cls.images if key not in cls.used and key not in cls.pinned]:
+            image = cls.images.pop(key)
+            if key[3]:
+                cls.rotated_bytes -= image.get_width() * image.get_height() * image.get_bytesize()
+        for key in [key for key in cls.sounds if key not in cls.used and key not in cls.pinned]:
+            del cls.sounds[key]
+        for key in [key for key in cls.animations if key not in cls.used]:
+            del cls.animations[key]
+        cls.used = set()
+
+    @classmethod
+    def get_stats(cls):
+        return {'hits': cls.hits, 'misses': cls.misses, 'images': len(cls.images), 'sounds': len(cls.sounds), 'animations': len(cls.animations)}
+
+class Loader:
+    # decodes images and sounds and compiles maps on worker threads, the main thread installs the results in Assets
+    def __init__(self, workers=LOADER_WORKERS):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix='loader')
+        self.jobs = []
+        self.queued = set()
+        self.critical_total = 0
+        self.critical_done = 0
+        self.streamed = 0
+        self.failed = 0
+
+    def add(self, path, critical=True):
+        if path in self.queued:
+            return
+        if path.endswith('.png'):
+            job = pg.image.load
+        elif path.endswith('.wav'):
+            job = pg.mixer.Sound
+        elif path.endswith('.tmx'):
+            job = CompiledMap.prepare
+        else:
+            return
+        self.queued.add(path)
+        self.jobs.append((path, self.executor.submit(job, path), critical))
+        if critical:
+            self.critical_total += 1
+
+    def add_folder(self, folder, critical=False):
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for name in sorted(files):
+                self.add(os.path.join(root, name).replace(os.sep, '/'), critical)
+
+    def install(self, path, future, critical):
+        # a broken critical asset aborts the load, a broken streamed one is counted and dropped,
+        # only the critical startup assets are pinned, streamed ones stay evictable
+        try:
+            result = future.result()
+        except Exception:
+            if critical:
+                raise
+            self.failed += 1
+            return
+        if path.endswith('.png'):
+            Assets.add_image(path, result, pin=critical)
+        elif path.endswith('.wav'):
+            Assets.add_sound(path, result, pin=critical)
+        if critical:
+            self.critical_done += 1
+        else:
+            self.streamed += 1
+
+    def update(self, budget=None):
+        # installs finished jobs until budget ms have passed
+        start = time.perf_counter()
+        for job in [job for job in self.jobs if job[1].done()]:
+            if budget is not None and (time.perf_counter() - start) * 1000 >= budget:
+                break
+            self.install(*job)
+            self.jobs.remove(job)
+
+    def wait(self):
+        wait([future for path, future, critical in self.jobs if critical], return_when=FIRST_COMPLETED)
+
+    def is_ready(self):
+        return self.critical_done == self.critical_total
+
+    def get_progress(self):
+        return self.critical_done / self.critical_total if self.critical_total else 1
+
+    def get_stats(self):
+        return {'critical': self.critical_total, 'streamed': self.streamed, 'failed': self.failed, 'pending': len(self.jobs)}
+
+    def stop(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
 class Sound:
     def __init__(self, path, volume=0.1):
-        self.sound = pg.mixer.Sound(path)
+        self.sound = Assets.get_sound(path, volume)
         self.volume = volume
-        self.set_volume(self.volume)
     def set_volume(self, volume):
         self.sound.set_volume(volume)
     def play(self):
         self.sound.play()
 
+class Profiler:
+    # toggled with F3, phases are only timed while the overlay is shown
+    is_active = False
+    history = 120
+    refresh_interval = 10
+    budget = 1000 / FPS
+
+    phases = {}
+    frame_times = deque(maxlen=history)
+    phase = None
+    phase_start = 0
+    frame_time = 0
+    frame_num = 0
+    image = None
+    # set by the game, the overlay shows how many streamed assets failed to load
+    loader = None
+
+    @classmethod
+    def toggle(cls):
+        cls.is_active = not cls.is_active
+        cls.phases = {}
+        cls.frame_times.clear()
+        cls.phase = None
+        cls.frame_time = 0
+        cls.image = None
+
+    @classmethod
+    def begin(cls, name):
+        if not cls.is_active:
+            return
+        now = time.perf_counter()
+        if cls.phase is not None:
+            cls.add_time(now)
+        cls.phase = name
+        cls.phase_start = now
+
+    @classmethod
+    def end(cls):
+        if cls.is_active and cls.phase is not None:
+            cls.add_time(time.perf_counter())
+            cls.phase = None
+
+    @classmethod
+    def add_time(cls, now):
+        ms = (now - cls.phase_start) * 1000
+        if cls.phase not in cls.phases:
+            cls.phases[cls.phase] = deque(maxlen=cls.history)
+        cls.phases[cls.phase].append(ms)
+        cls.frame_time += ms
+
+    @classmethod
+    def end_frame(cls):
+        if not cls.is_active:
+            return
+        cls.frame_times.append(cls.frame_time)
+        cls.frame_time = 0
+        cls.frame_num += 1
+
+    @classmethod
+    def render(cls):
+        counts = {
+            'platforms': len(Globals.dynamic_platforms),
+            'enemies': len(Globals.enemies),
+            'mid': Activation.counts['mid'],
+            'asleep': Activation.counts['asleep'],
+            'bosses': len(Globals.bosses),
+            'arrows': len(Globals.arrows),
+            'coins': len(Globals.coin_field),
+            'chests': len(Globals.chests),
+            'items': len(Globals.items),
+            'bp_sprites': len(Globals.bp_sprites),
+            'pooled': sum(len(pool.free) for pool in (Globals.arrow_pool, Globals.fireball_pool, Globals.bullet_pool)),
+            'drawn': Globals.drawn_count,
+            'culled': Globals.culled_count,
+            'load failed': cls.loader.failed if cls.loader is not None else 0,
+        }
+        update_phases = [(name, times) for name, times in cls.phases.items() if not name.startswith('draw ')]
+        draw_phases = [(name[5:], times) for name, times in cls.phases.items() if name.startswith('draw ')]
+        rows = max(len(update_phases), len(draw_phases))
+        count_rows = (len(counts) + 3) // 4
+
+        line_height = 14
+        graph_height = 60
+        image = pg.Surface((360, (rows + count_rows + 2)*line_height + graph_height + 15), pg.SRCALPHA)
+        image.fill((0, 0, 0, 170))
+
+        if cls.frame_times:
+            average = sum(cls.frame_times) / len(cls.frame_times)
+            text = f'frame {average:.2f} ms  max {max(cls.frame_times):.2f} ms  budget {cls.budget:.1f} ms'
+            image.blit(Assets.get_font(SMALL_FONT_SIZE).render(text, True, 'red' if average > cls.budget else 'white'), (5, 5))
+
+        for column, phases in enumerate((update_phases, draw_phases)):
+            x = 5 + column*180
+            for row, (name, times) in enumerate(phases):
+                y = 5 + (row + 1)*line_height
+                average = sum(times) / len(times)
+                value = Assets.get_font(SMALL_FONT_SIZE).render(f'{average:.2f}', True, 'orange' if average > cls.budget/4 else 'white')
+                image.blit(Assets.get_font(SMALL_FONT_SIZE).render(name, True, 'white'), (x, y))
+                image.blit(value, (x + 165 - value.get_width(), y))
+
+        for i, (name, count) in enumerate(counts.items()):
+            x = 5 + i % 4 * 90
+            y = 5 + (rows + 1 + i // 4)*line_height + 5
+            image.blit(Assets.get_font(SMALL_FONT_SIZE).render(f'{name} {count}', True, 'yellow'), (x, y))
+
+        # one bar per frame, the white line marks the frame budget at half height
+        bottom = image.get_height() - 5
+        scale = graph_height / (cls.budget * 2)
+        for i, frame_time in enumerate(cls.frame_times):
+            height = min(frame_time * scale, graph_height)
+            color = 'red' if frame_time > cls.budget else 'green'
+            pg.draw.line(image, color, (5 + i*2, bottom), (5 + i*2, bottom - height))
+        pg.draw.line(image, 'white', (5, bottom - graph_height/2), (5 + cls.history*2, bottom - graph_height/2))
+        return image
+
+    @classmethod
+    def draw(cls):
+        if not cls.is_active:
+            return
+        if cls.image is None or cls.frame_num % cls.refresh_interval == 0:
+            cls.image = cls.render()
+        Globals.screen.blit(cls.image, (SCREEN_WIDTH - cls.image.get_width() - 10, 50))
+
+class StartupTimer:
+    # wall time of each launch phase, reported once the game is ready
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.phases = []
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, (now - self.last) * 1000))
+        self.last = now
+
+    def get_total(self):
+        return (self.last - self.start) * 1000
+
+    def report(self):
+        phases = ', '.join(f'{name} {ms:.1f}' for name, ms in self.phases)
+        print(f'startup {self.get_total():.1f} ms ({phases})')
+
 class Blueprint(pg.sprite.Sprite):
     def __init__(self):
         super(Blueprint, self).__init__()
@@ -79,11 +774,9 @@ class Blueprint(pg.sprite.Sprite):
         self.current_animation = []
         self.current_image = 0
         self.animation_timer = Timer(100)
+        self.pool = None
     def load_image(self, path: str, size: tuple | list=None):
-        if size is not None:
-            return self.resize_image(pg.image.load(path), size)
-        else:
-            return pg.image.load(path)
+        return Assets.get_image(path, size)
     def resize_image(self, image, size: tuple | list):
         return pg.transform.scale(image, size)
     def rotate_image(self, image, rotation):
@@ -128,33 +821,65 @@ class Blueprint(pg.sprite.Sprite):
     def move(self):
         if self.velocity_y < 20:
             self.velocity_y += self.gravity
-        self.rect.x += self.velocity_x
-        self.rect.y += self.velocity_y
+        self.move_swept(self.velocity_x, self.velocity_y)
     def move_advanced(self, group):
-        vel_x = self.velocity_x
-        vel_y = self.velocity_y
-        col_num = 1
-        while abs(vel_x) > 16 or abs(vel_y) > 16:
-            vel_x /= 2
-            vel_y /= 2
-            col_num *= 2
-        for i in range(col_num):
-            self.add_pos((vel_x, vel_y))
-            if self.check_group_collision(group):
-                self.set_velocity((0, 0))
-                return
-    def get_velocity_advanced(self):
-        vel_x = self.velocity_x
-        vel_y = self.velocity_y
-        col_num = 1
-        while vel_x > 48 or vel_y > 48:
-            vel_x /= 2
-            vel_y /= 2
-            col_num *= 2
-
-        return ((vel_x, vel_y), col_num)
+        if self.move_swept(self.velocity_x, self.velocity_y, group) is not None:
+            self.set_velocity((0, 0))
+    def get_time_of_impact(self, rect: pg.rect.Rect, dx, dy):
+        # swept AABB, (t, axis) of the first overlap with rect during this move or None
+        if dx > 0:
+            entry_x, exit_x = (rect.left - self.rect.right) / dx, (rect.right - self.rect.left) / dx
+        elif dx < 0:
+            entry_x, exit_x = (rect.right - self.rect.left) / dx, (rect.left - self.rect.right) / dx
+        elif self.rect.left < rect.right and self.rect.right > rect.left:
+            entry_x, exit_x = -float('inf'), float('inf')
+        else:
+            return None
+        if dy > 0:
+            entry_y, exit_y = (rect.top - self.rect.bottom) / dy, (rect.bottom - self.rect.top) / dy
+        elif dy < 0:
+            entry_y, exit_y = (rect.bottom - self.rect.top) / dy, (rect.top - self.rect.bottom) / dy
+        elif self.rect.top < rect.bottom and self.rect.bottom > rect.top:
+            entry_y, exit_y = -float('inf'), float('inf')
+        else:
+            return None
+
+        # already overlapping is left to the usual collision handling
+        entry = max(entry_x, entry_y)
+        if entry < 0 or entry >= 1 or entry >= min(exit_x, exit_y):
+            return None
+        return entry, 'x' if entry_x > entry_y else 'y'
+    def sweep(self, dx, dy, group: tuple | list=(), ignore: tuple=(), penetration=0):
+        # one broadphase query over the swept bounds, returns (t, axis, hit) of the first impact
+        bounds = self.rect.union(self.rect.move(dx, dy)).inflate(2, 2)
+        candidates = [hit for hit in Globals.platform_grid.query(bounds) if hit.type not in ignore]
+        candidates += [obj for obj in group if bounds.colliderect(obj.rect)]
+        first = (1, None, None)
+        for hit in candidates:
+            impact = self.get_time_of_impact(hit.rect, dx, dy)
+            if impact is None:
+                continue
+            # a surface already touched, like the floor under a grounded entity, only blocks a move into it
+            # deeper than penetration, smaller ones are left to the overlap checks so it can't hide a wall
+            if impact[0] == 0 and abs(dx if impact[1] == 'x' else dy) <= penetration:
+                continue
+            if impact[0] < first[0]:
+                first = (impact[0], impact[1], hit)
+        return first
+    def move_swept(self, dx, dy, group: tuple | list=(), penetration=1, ignore: tuple=()):
+        # moves at most penetration px into the first obstacle on the way so the overlap checks still see it
+        if abs(dx) <= penetration and abs(dy) <= penetration:
+            self.add_pos((dx, dy))
+            return None
+        t, axis, hit = self.sweep(dx, dy, group, ignore, penetration)
+        if hit is not None:
+            t = min(1, t + penetration / abs(dx if axis == 'x' else dy))
+        self.add_pos((dx*t, dy*t))
+        return hit
     def check_collision(self, rect: pg.rect.Rect):
         return self.rect.colliderect(rect)
+    def check_platform_collision(self):
+        return Globals.platform_grid.query(self.rect)
     def check_group_collision(self, group: tuple | list):
         hits = []
         for obj in group:
@@ -210,6 +935,11 @@ class Blueprint(pg.sprite.Sprite):
         return animation
     def flip_animation(self, animation: list, new_side: str='left', side: str='right'):
         return [self.flip_image_by_side(image, new_side, side) for image in animation]
+    def load_animation(self, path: str, num_images: int, size: tuple | list, scale: int=TILE_SCALE, new_side: str='right', flip: bool=False):
+        key = (path, num_images, tuple(size), scale, new_side, flip)
+        if flip:
+            return Assets.get_animation(key, lambda: self.flip_animation(self.load_animation(path, num_images, size, scale, new_side)))
+        return Assets.get_animation(key, lambda: self.add_animation(self.load_image(path), num_images, size, scale, new_side))
     def set_animation(self, animation):
         if self.current_animation != animation:
             self.current_animation = animation
@@ -227,10 +957,15 @@ class Blueprint(pg.sprite.Sprite):
             group.add(sprite)
         return sprite
     def kill(self, group: pg.sprite.Group=None):
+        was_alive = self.alive()
         if group is None:
             Globals.bp_sprites.remove(self)
         else:
             group.remove(self)
+        if self.pool is not None and was_alive and not self.alive():
+            self.pool.release(self)
+    def is_visible(self):
+        return self.rect.colliderect(Globals.cull_rect)
     def draw(self):
         Globals.screen.blit(self.image, self.rect.move(-Globals.camera_x, -Globals.camera_y))
 
@@ -263,20 +998,335 @@ class Group:
         for group in self.groups:
             group.remove(sprite)
 
-class Platform(pg.sprite.Sprite):
-    def __init__(self, image, x, y):
-        super(Platform, self).__init__()
+    def __len__(self):
+        return sum(len(group) for group in self.groups)
+
+class Pool:
+    # hands out killed projectiles again through their reset() instead of constructing new ones
+    def __init__(self, factory, cap=64):
+        self.factory = factory
+        self.cap = cap
+        self.free = []
+        self.live = 0
+        self.high_water = 0
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args):
+        if self.free:
+            sprite = self.free.pop()
+            sprite.reset(*args)
+            self.reused += 1
+        else:
+            sprite = self.factory(*args)
+            sprite.pool = self
+            self.created += 1
+        self.live += 1
+        self.high_water = max(self.high_water, self.live)
+        return sprite
+
+    def release(self, sprite):
+        self.live -= 1
+        if len(self.free) < self.cap:
+            self.free.append(sprite)
+
+    def get_stats(self):
+        return {'live': self.live, 'free': len(self.free), 'high_water': self.high_water, 'created': self.created, 'reused': self.reused}
+
+class LifecycleRule:
+    def __init__(self, group, ttl=None, cap=None, merge_radius=0):
+        self.group = group
+        self.ttl = ttl
+        self.cap = cap
+        self.merge_radius = merge_radius
+
+        # spawn order and expiry tick per live sprite, the queues may hold stale entries
+        self.born = {}
+        self.expires = {}
+        self.oldest = deque()
+        self.expiring = []
+        self.sequence = 0
+
+        self.spawned = 0
+        self.expired = 0
+        self.evicted = 0
+        self.merged = 0
+
+class Lifecycle:
+    # despawns sprites after their group's ttl, evicts the oldest past the cap and merges item stacks
+    rules = {}
+    frame_num = 0
+    merge_interval = 30
+    compact_interval = 300
 
-        self.image = pg.transform.scale(image, (Globals.tmx_map.tilewidth*TILE_SCALE, Globals.tmx_map.tileheight*TILE_SCALE))
-        self.rect = self.image.get_rect()
-        self.rect.x = x*TILE_SCALE
-        self.rect.y = y*TILE_SCALE
+    @classmethod
+    def add_rule(cls, name, group, ttl=None, cap=None, merge_radius=0):
+        cls.rules[name] = LifecycleRule(group, ttl, cap, merge_radius)
+
+    @classmethod
+    def spawn(cls, name, sprite, ttl=None):
+        rule = cls.rules[name]
+        rule.group.add(sprite)
+        rule.sequence += 1
+        rule.born[sprite] = rule.sequence
+        rule.oldest.append((rule.sequence, sprite))
+        rule.spawned += 1
+        cls.renew(name, sprite, ttl)
+        if rule.cap is not None:
+            cls.evict(rule)
+        return sprite
+
+    @classmethod
+    def renew(cls, name, sprite, ttl=None):
+        rule = cls.rules[name]
+        ttl = rule.ttl if ttl is None else ttl
+        if ttl is None:
+            return
+        rule.expires[sprite] = get_ticks() + ttl
+        rule.sequence += 1
+        heapq.heappush(rule.expiring, (rule.expires[sprite], rule.sequence, sprite))
+
+    @classmethod
+    def despawn(cls, rule, sprite):
+        if isinstance(sprite, Blueprint):
+            sprite.kill(rule.group)
+        else:
+            sprite.kill()
+        rule.born.pop(sprite, None)
+        rule.expires.pop(sprite, None)
+
+    @classmethod
+    def evict(cls, rule):
+        while len(rule.group) > rule.cap and rule.oldest:
+            born, sprite = rule.oldest.popleft()
+            # entries of sprites picked up or respawned since are stale
+            if rule.born.get(sprite) == born and rule.group.has(sprite):
+                cls.despawn(rule, sprite)
+                rule.evicted += 1
+
+    @classmethod
+    def expire(cls, rule):
+        now = get_ticks()
+        while rule.expiring and rule.expiring[0][0] <= now:
+            expires, sequence, sprite = heapq.heappop(rule.expiring)
+            if rule.expires.get(sprite) == expires and rule.group.has(sprite):
+                cls.despawn(rule, sprite)
+                rule.expired += 1
+
+    @classmethod
+    def merge(cls, rule):
+        # bucket by cell, each item only looks at its own and the neighbouring cells
+        cells = {}
+        for item in list(rule.group):
+            stacksize = getattr(item.item_type, 'stacksize', 1)
+            if stacksize <= 1:
+                continue
+            x, y = item.rect.centerx // rule.merge_radius, item.rect.centery // rule.merge_radius
+            for cell in ((x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)):
+                for other in cells.get(cell, ()):
+                    if (other.item_type.type == item.item_type.type and other.item_type.amount + item.item_type.amount <= stacksize
+                            and abs(other.rect.centerx - item.rect.centerx) <= rule.merge_radius and abs(other.rect.centery - item.rect.centery) <= rule.merge_radius):
+                        other.item_type.amount += item.item_type.amount
+                        cls.despawn(rule, item)
+                        rule.merged += 1
+                        break
+                else:
+                    continue
+                break
+            else:
+                cells.setdefault((x, y), []).append(item)
+
+    @classmethod
+    def compact(cls, rule):
+        # drop bookkeeping for sprites that left the group some other way
+        rule.born = {sprite: born for sprite, born in rule.born.items() if rule.group.has(sprite)}
+        rule.expires = {sprite: expires for sprite, expires in rule.expires.items() if sprite in rule.born}
+        rule.oldest = deque(entry for entry in rule.oldest if rule.born.get(entry[1]) == entry[0])
+        rule.expiring = [entry for entry in rule.expiring if rule.expires.get(entry[2]) == entry[0]]
+        heapq.heapify(rule.expiring)
+
+    @classmethod
+    def update(cls):
+        cls.frame_num += 1
+        for rule in cls.rules.values():
+            cls.expire(rule)
+            if rule.cap is not None:
+                cls.evict(rule)
+            if rule.merge_radius and cls.frame_num % cls.merge_interval == 0:
+                cls.merge(rule)
+            if cls.frame_num % cls.compact_interval == 0:
+                cls.compact(rule)
+
+    @classmethod
+    def get_stats(cls):
+        return {name: {'live': len(rule.group), 'spawned': rule.spawned, 'expired': rule.expired, 'evicted': rule.evicted, 'merged': rule.merged, 'tracked': len(rule.born)} for name, rule in cls.rules.items()}
+
+class SpatialGrid:
+    def __init__(self, cell_size=TILE_SIZE*TILE_SCALE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.dynamic = []
+
+    def clear(self):
+        self.cells = {}
+        self.dynamic = []
+
+    def get_cells(self, rect: pg.rect.Rect):
+        left = rect.left // self.cell_size
+        right = (rect.right - 1) // self.cell_size
+        top = rect.top // self.cell_size
+        bottom = (rect.bottom - 1) // self.cell_size
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                yield x, y
+
+    def add(self, sprite):
+        for cell in self.get_cells(sprite.rect):
+            self.cells.setdefault(cell, []).append(sprite)
+
+    def add_dynamic(self, sprite):
+        # moving sprites are checked every query instead of being hashed
+        self.dynamic.append(sprite)
+
+    def query(self, rect: pg.rect.Rect):
+        hits = []
+        seen = set()
+        for cell in self.get_cells(rect):
+            for sprite in self.cells.get(cell, ()):
+                if sprite not in seen and rect.colliderect(sprite.rect):
+                    seen.add(sprite)
+                    hits.append(sprite)
+        for sprite in self.dynamic:
+            if rect.colliderect(sprite.rect):
+                hits.append(sprite)
+        return hits
+
+class ChunkLayer(SpatialGrid):
+    def __init__(self, chunk_size=512, max_chunks=24):
+        super(ChunkLayer, self).__init__(chunk_size)
+        self.max_chunks = max_chunks
+        self.surfaces = {}
+
+    def clear(self):
+        super(ChunkLayer, self).clear()
+        self.surfaces = {}
+
+    def bake(self, cell):
+        x = cell[0] * self.cell_size
+        y = cell[1] * self.cell_size
+        surface = pg.Surface((self.cell_size, self.cell_size), pg.SRCALPHA)
+        for sprite in self.cells[cell]:
+            surface.blit(sprite.image, (sprite.rect.x - x, sprite.rect.y - y))
+        return surface
+
+    def get_surface(self, cell):
+        # chunks are baked on first sight and the least recently drawn one is dropped past max_chunks
+        surface = self.surfaces.pop(cell, None)
+        if surface is None:
+            surface = self.bake(cell)
+            if len(self.surfaces) >= self.max_chunks:
+                del self.surfaces[next(iter(self.surfaces))]
+        self.surfaces[cell] = surface
+        return surface
+
+    def draw(self, rect: pg.rect.Rect):
+        for cell in self.get_cells(rect):
+            if cell in self.cells:
+                Globals.screen.blit(self.get_surface(cell), (cell[0]*self.cell_size - rect.x, cell[1]*self.cell_size - rect.y))
+
+class Activation:
+    # update tiers by distance to the camera: near updates every frame, mid patrols coarsely every few frames, far sleeps
+    mid_margin = SCREEN_WIDTH
+    mid_interval = 4
+    frame_num = 0
+    offsets = 0
+    counts = {'near': 0, 'mid': 0, 'asleep': 0}
+
+    @classmethod
+    def next_offset(cls):
+        # staggers mid range updates over the interval, assigned in spawn order so replays match
+        cls.offsets += 1
+        return cls.offsets % cls.mid_interval
+
+    @classmethod
+    def begin_frame(cls):
+        cls.frame_num += 1
+        cls.near_rect = Globals.cull_rect
+        cls.mid_rect = Globals.screen_rect.inflate(cls.mid_margin*2, cls.mid_margin*2)
+        cls.counts = {'near': 0, 'mid': 0, 'asleep': 0}
+
+    @classmethod
+    def update(cls, entity):
+        rect = entity.get_activation_rect()
+        if rect.colliderect(cls.near_rect) or not entity.is_settled():
+            cls.counts['near'] += 1
+            entity.update()
+        elif rect.colliderect(cls.mid_rect):
+            cls.counts['mid'] += 1
+            if (cls.frame_num + entity.activation_offset) % cls.mid_interval == 0:
+                entity.coarse_update(cls.mid_interval)
+        else:
+            cls.counts['asleep'] += 1
+
+class CoinField:
+    # uncollected coin types by tile cell, all drawn with one shared animation phase,
+    # the grid only maps rects to the cells they cover
+    def __init__(self, cell_size=TILE_SIZE*TILE_SCALE, interval=100):
+        self.grid = SpatialGrid(cell_size)
+        self.cell_size = cell_size
+        self.interval = interval
+        self.coins = {}
+
+    def __len__(self):
+        return len(self.coins)
+
+    def add(self, pos, _type):
+        self.coins[(pos[0] // self.cell_size, pos[1] // self.cell_size)] = _type
+
+    def get_phase(self, animation):
+        return int(get_ticks() // self.interval) % len(animation)
+
+    def collect(self, rect: pg.rect.Rect):
+        # only the few cells under rect are looked at, a touched coin becomes a sprite
+        collected = []
+        for cell in self.grid.get_cells(rect):
+            if cell in self.coins:
+                pos = (cell[0]*self.cell_size, cell[1]*self.cell_size)
+                if rect.colliderect((pos, (self.cell_size, self.cell_size))):
+                    _type = self.coins.pop(cell)
+                    collected.append(Coin(pos, _type, self.get_phase(Coin.get_animation())))
+        return collected
+
+    def draw(self, rect: pg.rect.Rect):
+        animation = Coin.get_animation()
+        image = animation[self.get_phase(animation)]
+        for cell in self.grid.get_cells(rect):
+            if cell in self.coins:
+                Globals.screen.blit(image, (cell[0]*self.cell_size - rect.x, cell[1]*self.cell_size - rect.y))
+                Globals.drawn_count += 1
+
+class Platform:
+    # static tile, the image is the pre-scaled atlas surface shared by every tile with the same gid
+    __slots__ = ('image', 'rect', 'type')
+
+    def __init__(self, image, x, y, _type=None):
+        self.image = image
+        self.rect = image.get_rect(topleft=(x*TILE_SCALE, y*TILE_SCALE))
+        self.type = _type
+
+class Collider:
+    # solid tiles of the platforms layer merged into one rect, collision only
+    __slots__ = ('rect', 'type')
+
+    def __init__(self, rect, _type='block'):
+        self.rect = rect
+        self.type = _type
 
 class PlatformMovable(pg.sprite.Sprite):
     def __init__(self, image, start_pos, end_pos, velocity, _type):
         super(PlatformMovable, self).__init__()
 
-        self.image = pg.transform.scale(image, (Globals.tmx_map.tilewidth*TILE_SCALE, Globals.tmx_map.tileheight*TILE_SCALE))
+        self.image = image
         self.rect = self.image.get_rect(topleft=(start_pos[0]*TILE_SCALE, start_pos[1]*TILE_SCALE))
 
         self.type = _type
@@ -307,7 +1357,7 @@ class Checkpoint(pg.sprite.Sprite):
     def __init__(self, image, pos):
         super(Checkpoint, self).__init__()
 
-        self.image = pg.transform.scale(image, (TILE_SIZE*TILE_SCALE, TILE_SIZE*TILE_SCALE))
+        self.image = image
         self.rect = self.image.get_rect(topleft=(pos[0]*TILE_SCALE*TILE_SIZE, pos[1]*TILE_SCALE*TILE_SIZE))
 
     def update(self):
@@ -327,8 +1377,12 @@ class Entity(Blueprint):
         self.is_dead = False
         self.gravity = 1.75
         self.is_jumping = False
+        self.is_grounded = False
         self.side = 'right'
         self.effects = []
+        # deepest a single move may sink into a collider, midpoint resolution still needs to see the hit
+        self.max_penetration = TILE_SIZE
+        self.activation_offset = Activation.next_offset()
 
         # timers
         self.damage_timer = Timer(500)
@@ -366,14 +1420,16 @@ class Entity(Blueprint):
         for item in items:
             item = Item(item, self.rect.center)
             item.drop(self.rect.center)
-            Globals.items.add(item)
+            Lifecycle.spawn('items', item)
 
     def map_collision(self, keys=None):
-        hits = self.check_group_collision(Globals.platforms)
+        hits = self.check_platform_collision()
+        self.is_grounded = False
         for hit in hits:
             if hit.type != 'spike':
                 side_hits = self.handle_collision(hit.rect)
                 if 'bottom' in side_hits:
+                    self.is_grounded = True
                     self.is_jumping = False
                     if keys and keys[pg.K_SPACE] and not self.is_jumping:
                         self.jump()
@@ -386,6 +1442,16 @@ class Entity(Blueprint):
                 self.get_damage(1, 750, (0, -15))
         self.handle_group_collision(Globals.dispencers)
 
+    def get_activation_rect(self):
+        return self.rect
+
+    def is_settled(self):
+        # standing still on the ground and alive, safe to update coarsely or not at all
+        return self.hp > 0 and self.is_grounded and self.velocity_y == 0 and self.knockback == 0
+
+    def coarse_update(self, frames):
+        pass
+
     def draw_healthbar(self):
         pg.draw.rect(Globals.screen, pg.Color('black'), (self.rect.centerx - 25 - Globals.camera_x, self.rect.top - 25 - Globals.camera_y, 50, 10), 2)
         pg.draw.rect(Globals.screen, pg.Color('red'), (self.rect.centerx - 22 - Globals.camera_x, self.rect.top - 22 - Globals.camera_y, self.hp/self.max_hp*44, 4))
@@ -410,20 +1476,19 @@ class Entity(Blueprint):
     def move(self):
         if self.velocity_y <= 50:
             self.velocity_y += self.gravity
-        self.rect.y += self.velocity_y
-        self.rect.x += self.velocity_x + self.knockback
+        self.move_swept(self.velocity_x + self.knockback, self.velocity_y, penetration=self.max_penetration, ignore=('spike',))
         if self.velocity_y-self.gravity == 0:
             self.knockback = 0
 
 class Player(Entity):
     def __init__(self):
         super(Player, self).__init__()
-        self.idle_animation_right = self.add_animation(self.load_image('Assets/01 - Hobbit/idle.png'), 4, (19, 19), scale=4)
-        self.idle_animation_left = self.flip_animation(self.idle_animation_right)
-        self.move_animation_right = self.add_animation(self.load_image('Assets/01 - Hobbit/run.png'), 10, (19, 19), scale=4)
-        self.move_animation_left = self.flip_animation(self.move_animation_right)
-        self.jump_animation_right = self.add_animation(self.load_image('Assets/01 - Hobbit/jump.png'), 10, (19, 19), scale=4)
-        self.jump_animation_left = self.flip_animation(self.jump_animation_right)
+        self.idle_animation_right = self.load_animation('Assets/01 - Hobbit/idle.png', 4, (19, 19), scale=4)
+        self.idle_animation_left = self.load_animation('Assets/01 - Hobbit/idle.png', 4, (19, 19), scale=4, flip=True)
+        self.move_animation_right = self.load_animation('Assets/01 - Hobbit/run.png', 10, (19, 19), scale=4)
+        self.move_animation_left = self.load_animation('Assets/01 - Hobbit/run.png', 10, (19, 19), scale=4, flip=True)
+        self.jump_animation_right = self.load_animation('Assets/01 - Hobbit/jump.png', 10, (19, 19), scale=4)
+        self.jump_animation_left = self.load_animation('Assets/01 - Hobbit/jump.png', 10, (19, 19), scale=4, flip=True)
 
         self.spawn_point = PLAYER_START_POS
         self.set_rect_and_image(self.idle_animation_right[0], self.spawn_point)
@@ -434,11 +1499,14 @@ class Player(Entity):
         self.set_animation(self.idle_animation_right)
 
         self.money = 0
-        self.money_image = pg.transform.scale(pg.image.load('Assets/moneds/Coin.png'), (24, 24))
+        self.money_image = Assets.get_image('Assets/moneds/Coin.png', (24, 24))
         self.money_rect = self.money_image.get_rect(center=(SCREEN_WIDTH-48, 24))
         self.money_text_image, self.money_text_rect = render_text(self.money)
         self.money_text_rect.center = (SCREEN_WIDTH-24, 24)
 
+        self.health_surface = pg.Surface((110, 25), pg.SRCALPHA)
+        self.health_drawn = None
+
         self.inventory = Inventory()
 
         self.add_hotbar_slots()
@@ -453,6 +1521,15 @@ class Player(Entity):
         self.money_text_image, self.money_text_rect = render_text(self.money)
         self.money_text_rect.center = (SCREEN_WIDTH-24, 24)
 
+    def draw_health(self, screen):
+        width = self.hp/self.max_hp*100
+        if width != self.health_drawn:
+            self.health_drawn = width
+            self.health_surface.fill((0, 0, 0, 0))
+            pg.draw.rect(self.health_surface, pg.Color('black'), (0, 0, 110, 25), 3)
+            pg.draw.rect(self.health_surface, pg.Color('red'), (5, 5, width, 15))
+        screen.blit(self.health_surface, (95, 15))
+
     def draw_money(self, screen):
         screen.blit(self.money_image, self.money_rect)
         screen.blit(self.money_text_image, self.money_text_rect)
@@ -461,7 +1538,7 @@ class Player(Entity):
         item = self.hotbar_slots[self.active_slot].item
         if item is None:
             return
-        self.hotbar_slots[self.active_slot].item = None
+        self.inventory.set_item(self.hotbar_slots[self.active_slot], None)
         self.inventory.drop_item(item)
 
     def add_hotbar_slots(self):
@@ -484,51 +1561,50 @@ class Player(Entity):
         self.active_item = self.hotbar_slots[self.active_slot].item
         self.last_item = self.active_item
 
-    def draw_hotbar(self, screen):
-        cursor = [SCREEN_WIDTH/2 - SLOT_SIZE*4.5, SCREEN_HEIGHT - SLOT_SIZE]
-
+        self.hotbar_surface = pg.Surface((SLOT_SIZE*len(self.hotbar_slots), SLOT_SIZE), pg.SRCALPHA)
+        self.hotbar_rect = self.hotbar_surface.get_rect(topleft=self.hotbar_slots[0].hotbar_rect.topleft)
         for slot in self.hotbar_slots:
-            if self.active_slot == slot.num:
-                screen.blit(HOTBAR_SLOT_ACTIVE, slot.hotbar_rect)
-            else:
-                screen.blit(HOTBAR_SLOT_INACTIVE, slot.hotbar_rect)
-
-            if slot.item is not None:
-                screen.blit(slot.item.icon, (cursor[0]+SLOT_PADDING, cursor[1]+SLOT_PADDING, SLOT_SIZE, SLOT_SIZE))
-            cursor[0] += SLOT_SIZE
-
-    def update_hotbar(self):
-        mouse_keys = pg.mouse.get_pressed()
-        mouse_pos = pg.mouse.get_pos()
-        keys = pg.key.get_pressed()
+            slot.hotbar_drawn = None
 
+    def draw_hotbar(self, screen):
+        # a slot of the cached hotbar is redrawn only when its item or highlight changes
         for slot in self.hotbar_slots:
-            if keys[pg.K_1]:
-                self.active_slot = 0
-            elif keys[pg.K_2]:
-                self.active_slot = 1
-            elif keys[pg.K_3]:
-                self.active_slot = 2
-            elif keys[pg.K_4]:
-                self.active_slot = 3
-            elif keys[pg.K_5]:
-                self.active_slot = 4
-            elif keys[pg.K_6]:
-                self.active_slot = 5
-            elif keys[pg.K_7]:
-                self.active_slot = 6
-            elif keys[pg.K_8]:
-                self.active_slot = 7
-            elif keys[pg.K_9]:
-                self.active_slot = 8
-            elif keys[pg.K_0]:
-                self.active_slot = 9
+            drawn = (slot.item, self.active_slot == slot.num)
+            if drawn != slot.hotbar_drawn:
+                slot.hotbar_drawn = drawn
+                rect = slot.hotbar_rect.move(-self.hotbar_rect.x, -self.hotbar_rect.y)
+                self.hotbar_surface.fill((0, 0, 0, 0), rect)
+                if drawn[1]:
+                    self.hotbar_surface.blit(Assets.get_image(HOTBAR_SLOT_ACTIVE), rect)
+                else:
+                    self.hotbar_surface.blit(Assets.get_image(HOTBAR_SLOT_INACTIVE), rect)
+                if slot.item is not None:
+                    self.hotbar_surface.blit(slot.item.icon, rect.move(SLOT_PADDING, SLOT_PADDING))
+        screen.blit(self.hotbar_surface, self.hotbar_rect)
+
+    def select_slot(self, num):
+        self.active_slot = num
+
+    def scroll_slot(self, step):
+        self.active_slot += step
+        if self.active_slot > 8:
+            self.active_slot = 0
+        elif self.active_slot < 0:
+            self.active_slot = 8
+
+    def attack(self, value=None):
+        # the attack press goes to the item in hand, held buttons are read from the snapshot in update
+        if self.active_item is not None and not self.inventory.is_active and hasattr(self.active_item.item_type, 'on_attack'):
+            self.active_item.item_type.on_attack()
+            if self.active_item.item_type.delete:
+                self.inventory.set_item(self.hotbar_slots[self.active_slot], None)
 
+    def update_hotbar(self):
         self.last_item = self.active_item
         self.active_item = self.hotbar_slots[self.active_slot].item
 
     def update(self):
-        keys = pg.key.get_pressed()
+        keys = Input.get_keys()
 
         if not self.is_jumping:
             if self.current_animation == self.jump_animation_right or self.current_animation == self.jump_animation_left and self.current_image >= len(self.jump_animation_right)-1:
@@ -572,10 +1648,7 @@ class Player(Entity):
         self.handle_animation()
 
     def items_collision(self):
-        for slot in self.inventory.slots:
-                if slot.item is None:
-                    break
-        else:
+        if not self.inventory.has_free_slot:
             return
         for hit in self.check_group_collision(Globals.items):
             self.inventory.pick_up_item(hit)
@@ -618,7 +1691,8 @@ class Enemy(Entity):
         self.update_effects()
         self.move()
         self.map_collision()
-        self.handle_animation()
+        if self.hp <= 0 or self.is_visible():
+            self.handle_animation()
 
     def draw(self):
         Globals.screen.blit(self.image, self.rect.move(-Globals.camera_x, -Globals.camera_y))
@@ -626,6 +1700,22 @@ class Enemy(Entity):
             self.weapon.draw()
             self.draw_healthbar()
 
+    def coarse_update(self, frames):
+        # walks the patrol for several frames at once, stopping at the turning point,
+        # the step goes through the same platform query as map_collision and is dropped if it runs into
+        # something or leaves the leading foot without ground, the full update takes over once near again
+        if not self.can_move:
+            return
+        self.patrol()
+        remaining = self.distation - abs(abs(self.last_pos) - abs(self.rect.x))
+        step = max(0, min(self.walkspeed*frames, remaining))
+        dx = step if self.side == 'right' else -step
+        rect = self.rect.move(dx, 0)
+        foot = pg.rect.Rect(rect.right - 1 if self.side == 'right' else rect.left, rect.bottom, 1, 1)
+        if Globals.platform_grid.query(rect) or not [hit for hit in Globals.platform_grid.query(foot) if hit.type != 'spike']:
+            return
+        self.add_pos((dx, 0))
+
     def patrol(self):
         self.set_velocity((self.walkspeed if self.side == 'right' else -self.walkspeed, self.velocity_y))
         if abs(abs(self.last_pos) - abs(self.rect.x)) >= self.distation:
@@ -666,12 +1756,12 @@ class Orc(Enemy):
     def __init__(self, start_pos, final_pos, weapon_class, enemies):
         super(Orc, self).__init__(start_pos, final_pos, weapon_class, enemies)
 
-        self.idle_animation_right = self.add_animation(self.load_image('Assets/enemies/Orc - Rogue/Idle/Idle-Sheet.png'), 4, (20, 32), scale=3)
-        self.idle_animation_left = self.flip_animation(self.idle_animation_right, 'left')
-        self.move_animation_right = self.add_animation(self.load_image('Assets/enemies/Orc - Rogue/Run/Run-Sheet.png'), 6, (24, 32), scale=3)
-        self.move_animation_left = self.flip_animation(self.move_animation_right, 'left')
-        self.death_animation_right = self.add_animation(self.load_image('Assets/enemies/Orc - Rogue/Death/Death-Sheet.png'), 6, (33, 37), scale=3)
-        self.death_animation_left = self.flip_animation(self.death_animation_right, 'left')
+        self.idle_animation_right = self.load_animation('Assets/enemies/Orc - Rogue/Idle/Idle-Sheet.png', 4, (20, 32), scale=3)
+        self.idle_animation_left = self.load_animation('Assets/enemies/Orc - Rogue/Idle/Idle-Sheet.png', 4, (20, 32), scale=3, flip=True)
+        self.move_animation_right = self.load_animation('Assets/enemies/Orc - Rogue/Run/Run-Sheet.png', 6, (24, 32), scale=3)
+        self.move_animation_left = self.load_animation('Assets/enemies/Orc - Rogue/Run/Run-Sheet.png', 6, (24, 32), scale=3, flip=True)
+        self.death_animation_right = self.load_animation('Assets/enemies/Orc - Rogue/Death/Death-Sheet.png', 6, (33, 37), scale=3)
+        self.death_animation_left = self.load_animation('Assets/enemies/Orc - Rogue/Death/Death-Sheet.png', 6, (33, 37), scale=3, flip=True)
         self.set_animation(self.move_animation_right)
 
         self.set_rect_and_image(self.move_animation_right[0])
@@ -682,12 +1772,12 @@ class Skeleton(Enemy):
     def __init__(self, start_pos, final_pos, weapon_class, enemies):
         super(Skeleton, self).__init__(start_pos, final_pos, weapon_class, enemies)
 
-        self.idle_animation_right = self.add_animation(self.load_image('Assets/enemies/Skeleton - Warrior/Idle/Idle-Sheet.png'), 4, (20, 32), scale=3)
-        self.idle_animation_left = self.flip_animation(self.idle_animation_right, 'left')
-        self.move_animation_right = self.add_animation(self.load_image('Assets/enemies/Skeleton - Warrior/Run/Run-Sheet.png'), 6, (23, 32), scale=3)
-        self.move_animation_left = self.flip_animation(self.move_animation_right, 'left')
-        self.death_animation_right = self.add_animation(self.load_image('Assets/enemies/Skeleton - Warrior/Death/Death-Sheet.png'), 6, (36, 46), scale=3)
-        self.death_animation_left = self.flip_animation(self.death_animation_right, 'left')
+        self.idle_animation_right = self.load_animation('Assets/enemies/Skeleton - Warrior/Idle/Idle-Sheet.png', 4, (20, 32), scale=3)
+        self.idle_animation_left = self.load_animation('Assets/enemies/Skeleton - Warrior/Idle/Idle-Sheet.png', 4, (20, 32), scale=3, flip=True)
+        self.move_animation_right = self.load_animation('Assets/enemies/Skeleton - Warrior/Run/Run-Sheet.png', 6, (23, 32), scale=3)
+        self.move_animation_left = self.load_animation('Assets/enemies/Skeleton - Warrior/Run/Run-Sheet.png', 6, (23, 32), scale=3, flip=True)
+        self.death_animation_right = self.load_animation('Assets/enemies/Skeleton - Warrior/Death/Death-Sheet.png', 6, (36, 46), scale=3)
+        self.death_animation_left = self.load_animation('Assets/enemies/Skeleton - Warrior/Death/Death-Sheet.png', 6, (36, 46), scale=3, flip=True)
 
         self.walkspeed = 3
         self.loot = [Potion(Globals.player, Effect('heal', 2000, 6001)), Usable(Globals.player, 'arrow', random.randint(1, 2))]
@@ -706,12 +1796,12 @@ class Boss(Entity):
         self.hp = 50
         self.max_hp = self.hp
 
-        self.idle_animation_right = self.add_animation(self.load_image('Assets/enemies/Orc - Shaman/Idle/Idle-Sheet.png'), 4, (25, 27), scale=5)
-        self.idle_animation_left = self.flip_animation(self.idle_animation_right, 'left')
-        self.move_animation_right = self.add_animation(self.load_image('Assets/enemies/Orc - Shaman/Run/Run-Sheet.png'), 6, (25, 27), scale=5)
-        self.move_animation_left = self.flip_animation(self.move_animation_right, 'left')
-        self.death_animation_right = self.add_animation(self.load_image('Assets/enemies/Orc - Shaman/Death/Death-Sheet.png'), 6, (34, 29), scale=5)
-        self.death_animation_left = self.flip_animation(self.death_animation_right, 'left')
+        self.idle_animation_right = self.load_animation('Assets/enemies/Orc - Shaman/Idle/Idle-Sheet.png', 4, (25, 27), scale=5)
+        self.idle_animation_left = self.load_animation('Assets/enemies/Orc - Shaman/Idle/Idle-Sheet.png', 4, (25, 27), scale=5, flip=True)
+        self.move_animation_right = self.load_animation('Assets/enemies/Orc - Shaman/Run/Run-Sheet.png', 6, (25, 27), scale=5)
+        self.move_animation_left = self.load_animation('Assets/enemies/Orc - Shaman/Run/Run-Sheet.png', 6, (25, 27), scale=5, flip=True)
+        self.death_animation_right = self.load_animation('Assets/enemies/Orc - Shaman/Death/Death-Sheet.png', 6, (34, 29), scale=5)
+        self.death_animation_left = self.load_animation('Assets/enemies/Orc - Shaman/Death/Death-Sheet.png', 6, (34, 29), scale=5, flip=True)
         self.set_animation(self.idle_animation_left)
 
         self.set_rect_and_image(self.idle_animation_left[0])
@@ -739,11 +1829,11 @@ class Boss(Entity):
             self.timer.update()
 
         if self.spell == 'fireballs':
-            self.add_sprite(Fireball(self.rect.center, self.side, [self.enemy]))
+            self.add_sprite(Globals.fireball_pool.acquire(self.rect.center, self.side, [self.enemy]))
             self.add_knockback((10 if self.side == 'left' else -10, -10))
             self.spell = None
         elif self.spell == 'arrows':
-            self.add_sprite(Arrow(self.rect.center, 20, self.side, [self.enemy]), Globals.arrows)
+            Lifecycle.spawn('arrows', Globals.arrow_pool.acquire(self.rect.center, 20, self.side, [self.enemy]))
             self.spell = None
         elif self.spell == 'kick':
             if not self.timer.check(75):
@@ -796,6 +1886,16 @@ class Boss(Entity):
         self.move()
         self.map_collision()
 
+    def get_activation_rect(self):
+        # the boss wakes up as soon as its arena is near, not only when it is
+        return self.radius
+
+    def coarse_update(self, frames):
+        # the player is far outside the arena, same reset as in update
+        self.set_animation(self.idle_animation_right)
+        self.set_pos(self.radius.center)
+        self.hp = self.max_hp
+
     def draw(self):
         Globals.screen.blit(self.image, self.rect.move(-Globals.camera_x, -Globals.camera_y))
         self.draw_healthbar()
@@ -819,8 +1919,8 @@ class Usable(Blueprint):
             self.set_rect_and_image(image)
             self.stacksize = 16
         else:
-            self.image = INVALID_TEXTURE
-            self.icon = INVALID_TEXTURE
+            self.image = Assets.get_image(INVALID_TEXTURE)
+            self.icon = Assets.get_image(INVALID_TEXTURE)
 
         # misc
         self.delete = False
@@ -900,7 +2000,7 @@ class Bow(Usable):
         self.idle_image = self.load_image('Assets/weapons/Bow/idle.png', (45, 45))
         self.image = self.idle_image
         self.icon = self.resize_image(self.idle_image, (ITEM_SIZE, ITEM_SIZE))
-        self.pull_images = [self.resize_image(self.load_image(f'Assets/weapons/Bow/pull/pull{i+1}.png'), (45, 45)) for i in range(3)]
+        self.pull_images = [self.load_image(f'Assets/weapons/Bow/pull/pull{i+1}.png', (45, 45)) for i in range(3)]
         self.current_image = 0
         self.set_rect_and_image(self.image)
 
@@ -920,16 +2020,8 @@ class Bow(Usable):
 
     def update(self):
         if isinstance(self.owner, Player):
-            mouse_keys = pg.mouse.get_pressed()
-            for slot in Globals.player.inventory.slots:
-                if slot.item is not None and slot.item.item_type.type == 'arrow':
-                    do = True
-                    arrow = slot.item.item_type
-                    break
-            else:
-                do = False
-                arrow = None
-            self.pull(mouse_keys[0] and do, arrow)
+            mouse_keys = Input.get_mouse_buttons()
+            self.pull(mouse_keys[0] and Globals.player.inventory.arrow_count > 0, 'arrow')
         self.check_side()
 
     def pull(self, do, arrow=None):
@@ -950,9 +2042,9 @@ class Bow(Usable):
 
     def shoot(self, power, enemies, arrow):
         self.side = self.owner.side
-        self.add_sprite(Arrow((self.rect.centerx, self.rect.centery), power, self.side, enemies), Globals.arrows)
+        Lifecycle.spawn('arrows', Globals.arrow_pool.acquire((self.rect.centerx, self.rect.centery), power, self.side, enemies))
         if arrow is not None:
-            arrow.amount -= 1
+            Globals.player.inventory.consume(arrow)
         self.is_pulling = False
         self.current_image = 0
         self.image = self.flip_image_by_side(self.idle_image, self.owner.side)
@@ -971,40 +2063,29 @@ class Sword(Usable):
         self.damage = damage
         self.knockback = knockback
 
-        self.default_image = pg.image.load('Assets/weapons/sword.png')
-        self.icon = pg.transform.scale(self.default_image, (ITEM_SIZE, ITEM_SIZE))
-        self.default_image = pg.transform.scale(self.default_image, (45, 45))
+        self.icon = Assets.get_image('Assets/weapons/sword.png', (ITEM_SIZE, ITEM_SIZE))
+        self.default_image = Assets.get_image('Assets/weapons/sword.png', (45, 45))
         self.default_image = pg.transform.rotate(self.default_image, -self.rotation)
         self.image = self.default_image
         self.rect = self.image.get_rect()
 
         self.check_side_alt()
 
-        self.is_pressed = False
-
     def default(self):
-        self.is_pressed = False
         self.image = self.default_image
         self.is_attacking = False
         self.rotation = 0
 
-    def update(self):
-        if isinstance(self.owner, Player):
-            mouse_keys = pg.mouse.get_pressed()
-
-            if mouse_keys[0]:
-                if not self.is_pressed:
-                    self.attack()
-                    self.is_pressed = True
-            else:
-                self.is_pressed = False
+    def on_attack(self):
+        self.attack()
 
+    def update(self):
         if self.is_attacking:
             self.rotation += 5
             if self.rotation >= 75:
                 self.rotation = 0
                 self.is_attacking = False
-            self.image = pg.transform.rotate(self.default_image, -self.rotation if self.side == 'right' else self.rotation)
+            self.image = Assets.get_rotated('Assets/weapons/sword.png', (45, 45), self.side == 'left', -self.rotation if self.side == 'right' else self.rotation, 5)
             for enemy in self.enemies:
                 if self.rect.colliderect(enemy.rect):
                     kx = self.knockback[0] if self.side == 'right' else -self.knockback[0]
@@ -1026,14 +2107,17 @@ class Arrow(Blueprint):
         super(Arrow, self).__init__()
 
         self.collision_sound = Sound('Assets/sounds/arrow.wav')
+        self.despawn_delay_default = 50000
 
+        self.reset(pos, power, side, enemies)
+
+    def reset(self, pos, power, side, enemies):
         self.side = side
         self.power = power
         self.rotation = 0
         self.rot_k = 4 if self.side == 'right' else -4
 
-        self.default_image = self.flip_image_by_side(self.load_image('Assets/weapons/arrow.png'), self.side)
-        self.default_image = self.resize_image(self.default_image, (56, 14))
+        self.default_image = Assets.get_image('Assets/weapons/arrow.png', (56, 14), self.side != 'right')
         self.set_rect_and_image(self.default_image, pos)
 
         self.velocity_x = power if self.side == 'right' else -power
@@ -1041,19 +2125,17 @@ class Arrow(Blueprint):
         self.gravity = 2/power
 
         self.can_move = True
-        self.despawn_timer = Timer(10000)
-        self.despawn_delay_default = 50000
 
         self.enemies = enemies
 
     def update(self):
         if self.can_move:
-            hits = self.check_group_collision(Globals.platforms)
+            hits = self.check_platform_collision()
             if hits:
                 self.set_rect_by_image(self.image)
                 self.can_move = False
                 self.collision_sound.play()
-                self.despawn_timer.new_delay(self.despawn_delay_default)
+                Lifecycle.renew('arrows', self, self.despawn_delay_default)
                 for hit in hits:
                     sides = self.get_side_hits(hit.rect)
                     if sides:
@@ -1078,7 +2160,7 @@ class Arrow(Blueprint):
 
             self.rotation = self.velocity_y * self.rot_k
 
-            self.image = self.rotate_image(self.default_image, -self.rotation)
+            self.image = Assets.get_rotated('Assets/weapons/arrow.png', (56, 14), self.side != 'right', -self.rotation)
 
 class Item(pg.sprite.Sprite):
     def __init__(self, item_type, pos, kx=0, ky=0):
@@ -1091,18 +2173,19 @@ class Item(pg.sprite.Sprite):
         try:
             self.icon = self.item_type.icon
         except:
-            self.icon = INVALID_TEXTURE
+            self.icon = Assets.get_image(INVALID_TEXTURE)
 
         self.image = pg.transform.scale(self.icon, (42, 42))
         self.rect = self.image.get_rect(center=pos)
 
+        # starting velocity, once in an ItemGroup the group's arrays own position and velocity
         self.velocity_x = kx
         self.velocity_y = ky
-
-        self.gravity = 1
+        self.physics = None
+        self.index = None
 
     def update_timer(self):
-        self.pick_up_timer = pg.time.get_ticks()
+        self.pick_up_timer = get_ticks()
 
     def drop(self, pos):
         self.update_timer()
@@ -1112,38 +2195,133 @@ class Item(pg.sprite.Sprite):
         self.rect.center = pos
         self.velocity_x = kx
         self.velocity_y = ky
+        if self.physics is not None:
+            self.physics.load(self)
+
+class ItemGroup(pg.sprite.Group):
+    # dropped items stepped together, positions and velocities live in arrays indexed by item.index
+    gravity = 1
+    max_fall_speed = 20
+
+    def __init__(self, *sprites):
+        self.count = 0
+        self.allocate(64)
+        super(ItemGroup, self).__init__(*sprites)
+
+    def allocate(self, capacity):
+        old = self.count
+        self.x = np.resize(getattr(self, 'x', np.zeros(0, np.int64)), capacity)
+        self.y = np.resize(getattr(self, 'y', np.zeros(0, np.int64)), capacity)
+        self.vx = np.resize(getattr(self, 'vx', np.zeros(0, np.int64)), capacity)
+        self.vy = np.resize(getattr(self, 'vy', np.zeros(0, np.int64)), capacity)
+        self.w = np.resize(getattr(self, 'w', np.zeros(0, np.int64)), capacity)
+        self.h = np.resize(getattr(self, 'h', np.zeros(0, np.int64)), capacity)
+        self.resting = np.resize(getattr(self, 'resting', np.zeros(0, bool)), capacity)
+        self.slots = getattr(self, 'slots', [])[:old] + [None] * (capacity - old)
+
+    def add_internal(self, sprite, layer=None):
+        super(ItemGroup, self).add_internal(sprite, layer)
+        if self.count == len(self.slots):
+            self.allocate(len(self.slots) * 2)
+        sprite.physics = self
+        sprite.index = self.count
+        self.slots[self.count] = sprite
+        self.count += 1
+        self.load(sprite)
+
+    def remove_internal(self, sprite):
+        super(ItemGroup, self).remove_internal(sprite)
+        # the last item moves into the hole so the arrays stay dense
+        i, last = sprite.index, self.count - 1
+        moved = self.slots[last]
+        for array in (self.x, self.y, self.vx, self.vy, self.w, self.h, self.resting):
+            array[i] = array[last]
+        self.slots[i] = moved
+        moved.index = i
+        self.slots[last] = None
+        self.count -= 1
+        sprite.physics = None
+        sprite.index = None
+
+    def load(self, sprite):
+        i = sprite.index
+        self.x[i], self.y[i] = sprite.rect.topleft
+        self.w[i], self.h[i] = sprite.rect.size
+        self.vx[i], self.vy[i] = sprite.velocity_x, sprite.velocity_y
+        self.resting[i] = False
+
+    def probe(self, px, py):
+        # is the point inside a solid map tile
+        solid = Globals.solid_tiles
+        col, row = px // Globals.tile_size, py // Globals.tile_size
+        inside = (col >= 0) & (row >= 0) & (col < solid.shape[1]) & (row < solid.shape[0])
+        hits = np.zeros(len(px), bool)
+        hits[inside] = solid[row[inside], col[inside]]
+        return hits
 
-    def update(self):
-        for platform in Globals.platforms:
-            if self.rect.colliderect(platform.rect):
-                if platform.rect.collidepoint(self.rect.midtop):
-                    self.velocity_x, self.velocity_y = 0, 0
-                    self.rect.top = platform.rect.bottom
-                elif platform.rect.collidepoint(self.rect.midbottom):
-                    self.velocity_x, self.velocity_y = 0, 0
-                    self.rect.bottom = platform.rect.top
-                elif platform.rect.collidepoint(self.rect.midleft):
-                    self.velocity_x, self.velocity_y = 0, 0
-                    self.rect.left = platform.rect.right
-                elif platform.rect.collidepoint(self.rect.midright):
-                    self.velocity_x, self.velocity_y = 0, 0
-                    self.rect.right = platform.rect.left
-
-        if self.velocity_y < 20:
-            self.velocity_y += self.gravity
-
-        self.rect.x += self.velocity_x
-        self.rect.y += self.velocity_y
+    def step(self):
+        active = np.flatnonzero(~self.resting[:self.count])
+        if not len(active):
+            return
+        x, y, vx, vy = self.x[active], self.y[active], self.vx[active], self.vy[active]
+        w, h = self.w[active], self.h[active]
+        cx, cy = x + w // 2, y + h // 2
+        size = Globals.tile_size
+
+        # same midpoint probes as the sprite collision, top wins over bottom over left over right
+        top = self.probe(cx, y)
+        bottom = ~top & self.probe(cx, y + h)
+        left = ~top & ~bottom & self.probe(x, cy)
+        right = ~top & ~bottom & ~left & self.probe(x + w, cy)
+        y = np.where(top, (y // size + 1) * size, y)
+        y = np.where(bottom, (y + h) // size * size - h, y)
+        x = np.where(left, (x // size + 1) * size, x)
+        x = np.where(right, (x + w) // size * size - w, x)
+
+        # moving platforms are few, each is tested against the whole batch, items on them never rest
+        carried = np.zeros(len(active), bool)
+        for platform in Globals.dynamic_platforms:
+            if platform.type != 'vertical' and platform.type != 'horizontal':
+                continue
+            rect = platform.rect
+            cx, cy = x + w // 2, y + h // 2
+            inside_x = (cx >= rect.left) & (cx < rect.right)
+            inside_y = (cy >= rect.top) & (cy < rect.bottom)
+            on_top = inside_x & (y >= rect.top) & (y < rect.bottom)
+            on_bottom = ~on_top & inside_x & (y + h >= rect.top) & (y + h < rect.bottom)
+            on_left = ~on_top & ~on_bottom & inside_y & (x >= rect.left) & (x < rect.right)
+            on_right = ~on_top & ~on_bottom & ~on_left & inside_y & (x + w >= rect.left) & (x + w < rect.right)
+            y = np.where(on_top, rect.bottom, np.where(on_bottom, rect.top - h, y))
+            x = np.where(on_left, rect.right, np.where(on_right, rect.left - w, x))
+            carried |= on_top | on_bottom | on_left | on_right
+
+        hit = top | bottom | left | right | carried
+        vx = np.where(hit, 0, vx)
+        vy = np.where(hit, 0, vy)
+
+        # items landed on a tile stop being stepped until something knocks them again
+        vy = np.where(~bottom & (vy < self.max_fall_speed), vy + self.gravity, vy)
+        x = np.where(bottom, x, x + vx)
+        y = np.where(bottom, y, y + vy)
+
+        self.x[active], self.y[active], self.vx[active], self.vy[active] = x, y, vx, vy
+        self.resting[active] = bottom
+        for i, left, top in zip(active.tolist(), x.tolist(), y.tolist()):
+            self.slots[i].rect.topleft = (left, top)
 
 class Slot:
     def __init__(self, rect, slot_type, item=None):
         self.item = item
         self.rect = rect
         self.type = slot_type
+        self.priority = 0
 
 class Interface:
+    # rendered stack sizes, shared by every interface
+    labels = {}
+
     def __init__(self):
-        self.background_image = pg.image.load('Assets/interface/background.png')
+        self.background_image = Assets.get_image('Assets/interface/background.png')
         self.rect = self.background_image.get_rect(center=(SCREEN_WIDTH/2, SCREEN_HEIGHT/2))
 
         self.is_active = False
@@ -1155,95 +2333,122 @@ class Interface:
         self.row = 9
         self.slot_padding = 4
 
-        self.slot_inactive_image = pg.image.load('Assets/interface/slot_inactive.png')
-        self.slot_active_image = pg.image.load('Assets/interface/slot_active.png')
+        self.slot_inactive_image = Assets.get_image('Assets/interface/slot_inactive.png')
+        self.slot_active_image = Assets.get_image('Assets/interface/slot_active.png')
 
         self.order = ''
         self.slots = []
 
         self.picked_item = None
-        self.is_pressed = False
 
-    def choose_item(self):
-        mouse_pos = pg.mouse.get_pos()
-        mouse_keys = pg.mouse.get_pressed()
+    def set_item(self, slot, item):
+        slot.item = item
 
-        for slot in self.slots:
-            if mouse_keys[0]:
-                if not self.is_pressed:
-                    if slot.rect.collidepoint(mouse_pos):
-                        item = slot.item
-                        slot.item = self.picked_item
-                        self.picked_item = item
-                        self.is_pressed = True
-            else:
-                self.is_pressed = False
+    def choose_item(self, mouse_pos):
+        if not self.is_active:
+            return
+        slot = self.get_slot_at(mouse_pos)
+        if slot is not None and slot.rect.collidepoint(mouse_pos):
+            item = slot.item
+            self.set_item(slot, self.picked_item)
+            self.picked_item = item
+
+    def get_slot_at(self, pos):
+        # slot frames sit on step-sized columns, rows are looked up by their top edge
+        row = bisect.bisect_right(self.row_tops, pos[1]) - 1
+        if row < 0 or pos[1] - self.row_tops[row] >= self.slot_size:
+            return None
+        column, offset = divmod(pos[0] - self.grid_left, self.step)
+        if offset >= self.slot_size:
+            return None
+        return self.grid.get((row, column))
 
-    def update(self):
-        self.choose_item()
+    @classmethod
+    def get_label(cls, amount):
+        if amount not in cls.labels:
+            cls.labels[amount] = render_text(amount)[0]
+        return cls.labels[amount]
 
-    def draw_interface(self):
-        Globals.screen.blit(self.background_image, self.rect)
-        self.cursor = [self.rect.x + self.border_padding, self.rect.y + self.border_padding]
+    def draw_slot_item(self, surface, slot, offset):
+        if slot.item is None:
+            return
+        surface.blit(slot.item.icon, slot.rect.move(offset))
+        if slot.item.item_type.amount >= 2:
+            label = self.get_label(slot.item.item_type.amount)
+            surface.blit(label, label.get_rect(center=slot.rect.bottomright).move(offset))
+
+    def redraw_slot(self, slot):
+        # stack labels spill past the frame, so the area around the slot is repainted with its neighbours
+        offset = (-self.rect.x, -self.rect.y)
+        self.surface.set_clip(slot.frame.inflate(self.step, self.step).move(offset))
+        self.surface.fill((0, 0, 0, 0))
+        self.surface.blit(self.background_image, (0, 0), special_flags=pg.BLEND_RGBA_ADD)
+        for other in slot.neighbours:
+            self.surface.blit(self.slot_inactive_image, other.frame.move(offset))
+        for other in slot.neighbours:
+            self.draw_slot_item(self.surface, other, offset)
+        self.surface.set_clip(None)
+
+    def update_slots(self):
+        for slot in self.slots:
+            drawn = (slot.item, slot.item.item_type.amount if slot.item is not None else 0)
+            if drawn != slot.drawn:
+                slot.drawn = drawn
+                self.redraw_slot(slot)
 
-        mouse_pos = pg.mouse.get_pos()
-        mouse_keys = pg.mouse.get_pressed()
+    def draw_interface(self):
+        self.update_slots()
+        Globals.screen.blit(self.surface, self.rect)
 
-        for i in self.order:
-            if i == '0':
-                self.cursor[0] += self.slot_size + self.slot_padding
-            elif i == '1':
-                slot_rect = pg.rect.Rect(self.cursor[0], self.cursor[1], self.slot_size, self.slot_size)
-                if slot_rect.collidepoint(mouse_pos):
-                    Globals.screen.blit(self.slot_active_image, (slot_rect))
-                else:
-                    Globals.screen.blit(self.slot_inactive_image, (slot_rect))
-                self.cursor[0] += self.slot_size + self.slot_padding
-            elif i == '2':
-                slot_rect = pg.rect.Rect(self.cursor[0], self.cursor[1], self.slot_size, self.slot_size)
-                if slot_rect.collidepoint(mouse_pos):
-                    Globals.screen.blit(self.slot_active_image, (slot_rect))
-                else:
-                    Globals.screen.blit(self.slot_inactive_image, (slot_rect))
-                self.cursor[0] += self.slot_size + self.slot_padding
-            elif i == 'n':
-                self.cursor[0] = self.rect.x + self.border_padding
-                self.cursor[1] += self.slot_size + self.slot_padding
-            elif i == 'h':
-                self.cursor[0] = self.rect.x + self.border_padding
-                self.cursor[1] += self.slot_size/2 + self.slot_padding
-        
-        for slot in self.slots:
-            if slot.item is not None:
-                Globals.screen.blit(slot.item.icon, slot.rect)
-                if slot.item.item_type.amount >= 2:
-                    i, r = render_text(slot.item.item_type.amount)
-                    r.center = slot.rect.bottomright
-                    Globals.screen.blit(i, r)
+        mouse_pos = Input.get_mouse_pos()
 
+        slot = self.get_slot_at(mouse_pos)
+        if slot is not None:
+            Globals.screen.blit(self.slot_active_image, slot.frame)
+            clip = Globals.screen.get_clip()
+            Globals.screen.set_clip(slot.frame.clip(clip))
+            for other in slot.neighbours:
+                self.draw_slot_item(Globals.screen, other, (0, 0))
+            Globals.screen.set_clip(clip)
 
         if self.picked_item is not None:
             self.picked_item.rect.center = mouse_pos
             Globals.screen.blit(self.picked_item.icon, self.picked_item.rect)
 
     def add_slots(self):
-        self.cursor = [self.rect.x + self.border_padding, self.rect.y + self.border_padding]
+        # the order string is compiled once into slot frames, a lookup grid and a cached surface
+        self.step = self.slot_size + self.slot_padding
+        self.grid_left = self.rect.x + self.border_padding
+        self.row_tops = []
+        self.grid = {}
+        cursor = [self.grid_left, self.rect.y + self.border_padding]
 
         for i in self.order:
             if i == '0':
-                self.cursor[0] += self.slot_size + self.slot_padding
-            elif i == '1':
-                self.slots.append(Slot(pg.rect.Rect(self.cursor[0]+self.slot_padding, self.cursor[1]+self.slot_padding, self.slot_size-self.slot_padding, self.slot_size-self.slot_padding), 'inventory'))
-                self.cursor[0] += self.slot_size + self.slot_padding
-            elif i == '2':
-                self.slots.append(Slot(pg.rect.Rect(self.cursor[0]+self.slot_padding, self.cursor[1]+self.slot_padding, self.slot_size-self.slot_padding, self.slot_size-self.slot_padding), 'hotbar'))
-                self.cursor[0] += self.slot_size + self.slot_padding
+                cursor[0] += self.step
+            elif i == '1' or i == '2':
+                slot = Slot(pg.rect.Rect(cursor[0]+self.slot_padding, cursor[1]+self.slot_padding, self.slot_size-self.slot_padding, self.slot_size-self.slot_padding), 'inventory' if i == '1' else 'hotbar')
+                slot.frame = pg.rect.Rect(cursor[0], cursor[1], self.slot_size, self.slot_size)
+                if not self.row_tops or self.row_tops[-1] != slot.frame.y:
+                    self.row_tops.append(slot.frame.y)
+                self.grid[(len(self.row_tops) - 1, (slot.frame.x - self.grid_left) // self.step)] = slot
+                self.slots.append(slot)
+                cursor[0] += self.step
             elif i == 'n':
-                self.cursor[0] = self.rect.x + self.border_padding
-                self.cursor[1] += self.slot_size + self.slot_padding
+                cursor[0] = self.grid_left
+                cursor[1] += self.step
             elif i == 'h':
-                self.cursor[0] = self.rect.x + self.border_padding
-                self.cursor[1] += self.slot_size/2 + self.slot_padding
+                cursor[0] = self.grid_left
+                cursor[1] += self.slot_size/2 + self.slot_padding
+
+        for slot in self.slots:
+            area = slot.frame.inflate(self.step*2, self.step*2)
+            slot.neighbours = [other for other in self.slots if area.colliderect(other.frame)]
+            slot.drawn = None
+
+        self.surface = self.background_image.copy()
+        for slot in self.slots:
+            self.surface.blit(self.slot_inactive_image, slot.frame.move(-self.rect.x, -self.rect.y))
 
 class Inventory(Interface):
     def __init__(self):
@@ -1252,35 +2457,86 @@ class Inventory(Interface):
         self.order = '111111111nnnh222222222'
 
         self.add_slots()
+        self.index_slots()
+
+    def index_slots(self):
+        # hotbar slots are filled first, then the inventory, each in layout order
+        self.ordered = [slot for slot in self.slots if slot.type == 'hotbar'] + [slot for slot in self.slots if slot.type == 'inventory']
+        self.stacks = {}
+        self.counts = {}
+        self.free = set()
+        self.free_heap = []
+        self.has_free_slot = False
+        self.arrow_count = 0
+        for priority, slot in enumerate(self.ordered):
+            slot.priority = priority
+            item, slot.item = slot.item, None
+            self.free.add(priority)
+            self.free_heap.append(priority)
+            self.set_item(slot, item)
+        heapq.heapify(self.free_heap)
+
+    def set_item(self, slot, item):
+        # every slot write goes through here so the type index, counts and free slots stay in step
+        if slot.item is not None:
+            self.stacks[slot.item.item_type.type].discard(slot)
+            self.add_amount(slot.item.item_type.type, -slot.item.item_type.amount)
+        slot.item = item
+        if item is not None:
+            self.stacks.setdefault(item.item_type.type, set()).add(slot)
+            self.add_amount(item.item_type.type, item.item_type.amount)
+            self.free.discard(slot.priority)
+        elif slot.priority not in self.free:
+            self.free.add(slot.priority)
+            heapq.heappush(self.free_heap, slot.priority)
+        self.has_free_slot = bool(self.free)
+
+    def add_amount(self, _type, amount):
+        self.counts[_type] = self.counts.get(_type, 0) + amount
+        if _type == 'arrow':
+            self.arrow_count = self.counts[_type]
+
+    def get_free_slot(self):
+        # filled slots stay in the heap until they reach the top
+        while self.free_heap and self.free_heap[0] not in self.free:
+            heapq.heappop(self.free_heap)
+        if self.free_heap:
+            return self.ordered[self.free_heap[0]]
+        return None
+
+    def get_stacks(self, _type):
+        return sorted(self.stacks.get(_type, ()), key=lambda slot: slot.priority)
+
+    def consume(self, _type, amount=1):
+        stacks = self.get_stacks(_type)
+        if not stacks:
+            return
+        slot = stacks[0]
+        slot.item.item_type.amount -= amount
+        self.add_amount(_type, -amount)
+        if slot.item.item_type.amount <= 0:
+            self.set_item(slot, None)
 
     def pick_up_item(self, item):
-        if pg.time.get_ticks() - item.pick_up_timer >= item.pick_up_delay:
-            for slot in self.slots:
-                if slot.item is not None and slot.type == 'hotbar' and slot.item.item_type.type == item.item_type.type:
-                    if slot.item.item_type.amount + item.item_type.amount <= slot.item.item_type.stacksize:
-                        slot.item.item_type.amount += item.item_type.amount
-                        Globals.items.remove(item)
-                        return
-                    elif slot.item.item_type.amount + item.item_type.amount > slot.item.item_type.stacksize:
-                        item.item_type.amount -= slot.item.item_type.stacksize - slot.item.item_type.amount
-                        slot.item.item_type.amount = slot.item.item_type.stacksize
-                if slot.type == 'hotbar' and slot.item is None:
-                    slot.item = item
-                    Globals.items.remove(item)
-                    return
-            for slot in self.slots:
-                if slot.item is not None and slot.type == 'inventory' and slot.item.item_type.type == item.item_type.type:
-                    if slot.item.item_type.amount + item.item_type.amount <= slot.item.item_type.stacksize:
-                        slot.item.item_type.amount += item.item_type.amount
-                        Globals.items.remove(item)
-                        return
-                    elif slot.item.item_type.amount + item.item_type.amount > slot.item.item_type.stacksize:
-                        item.item_type.amount -= slot.item.item_type.stacksize - slot.item.item_type.amount
-                        slot.item.item_type.amount = slot.item.item_type.stacksize
-                if slot.type == 'inventory' and slot.item is None:
-                    slot.item = item
-                    Globals.items.remove(item)
-                    return
+        if get_ticks() - item.pick_up_timer < item.pick_up_delay:
+            return
+        item_type = item.item_type
+        # top up the stacks already holding this type, the first free slot takes the rest
+        for slot in self.get_stacks(item_type.type):
+            stack = slot.item.item_type
+            moved = min(item_type.amount, stack.stacksize - stack.amount)
+            if moved <= 0:
+                continue
+            stack.amount += moved
+            item_type.amount -= moved
+            self.add_amount(item_type.type, moved)
+            if item_type.amount <= 0:
+                Globals.items.remove(item)
+                return
+        slot = self.get_free_slot()
+        if slot is not None:
+            self.set_item(slot, item)
+            Globals.items.remove(item)
 
     def drop_item(self, item):
         if item is None:
@@ -1289,80 +2545,81 @@ class Inventory(Interface):
         kx = 10 if Globals.player.side == 'right' else -10
         ky = -10
         item.add_knockback(Globals.player.rect.center, kx, ky)
-        Globals.items.add(item)   
+        Lifecycle.spawn('items', item)
 
 class Chest(pg.sprite.Sprite):
     def __init__(self, pos, container=[]):
         super(Chest, self).__init__()
 
-        self.image = pg.transform.scale(pg.image.load('Assets/Legacy Adventure Pack - RUINS/Assets/Chest_closed.png'), (48, 48))
+        self.image = Assets.get_image('Assets/Legacy Adventure Pack - RUINS/Assets/Chest_closed.png', (48, 48))
         self.rect = self.image.get_rect(topleft=(pos[0]*TILE_SCALE, pos[1]*TILE_SCALE))
 
         self.container = container
         self.is_opened = False
 
         self.delay = 1000
-        self.timer = pg.time.get_ticks()
+        self.timer = get_ticks()
 
     def update(self):
         if len(self.container) > 0:
             if not self.is_opened:
                 if Globals.player.rect.colliderect(self.rect):
                     self.is_opened = True
-                    self.image = pg.transform.scale(pg.image.load('Assets/Legacy Adventure Pack - RUINS/Assets/Chest_opened.png'), (48, 48))
-                    self.timer = pg.time.get_ticks()
+                    self.image = Assets.get_image('Assets/Legacy Adventure Pack - RUINS/Assets/Chest_opened.png', (48, 48))
+                    self.timer = get_ticks()
             else:
-                if pg.time.get_ticks() - self.timer >= self.delay:
+                if get_ticks() - self.timer >= self.delay:
                     item = Item(self.container.pop(0), self.rect.center)
                     item.drop(self.rect.center)
-                    Globals.items.add(item)
-                    self.timer = pg.time.get_ticks()
+                    Lifecycle.spawn('items', item)
+                    self.timer = get_ticks()
 
 class Coin(pg.sprite.Sprite):
-    def __init__(self, pos, _type, amount=1):
+    # a collected coin flying up, coins still waiting on the map live in Globals.coin_field
+    def __init__(self, pos, _type, phase=0, amount=1):
         super(Coin, self).__init__()
 
-        self.amount = 1
+        self.amount = amount
         self.type = _type
 
-        self.load_animations()
-        self.current_image = 0
-        self.image = self.animation[0]
+        self.animation = self.get_animation()
+        self.current_image = phase
+        self.image = self.animation[phase]
         self.rect = self.image.get_rect(topleft=pos)
 
-        self.timer = pg.time.get_ticks()
+        self.timer = get_ticks()
         self.interval = 100
 
         self.is_alive = True
-        self.is_not_collected = True
 
         self.despawn_delay = 250
-        self.despawn_timer = pg.time.get_ticks()
+        self.despawn_timer = get_ticks()
 
     def update(self):
-        if pg.time.get_ticks() - self.timer > self.interval:
+        if get_ticks() - self.timer > self.interval:
             self.current_image += 1
             if self.current_image >= len(self.animation):
                 self.current_image = 0
             self.image = self.animation[self.current_image]
-            self.timer = pg.time.get_ticks()
+            self.timer = get_ticks()
 
-        if self.is_not_collected:
-            if Globals.player.rect.colliderect(self.rect):
-                self.is_not_collected = False
-                self.despawn_timer = pg.time.get_ticks()
-        elif not pg.time.get_ticks() - self.despawn_timer >= self.despawn_delay:
+        if not get_ticks() - self.despawn_timer >= self.despawn_delay:
             self.rect.y -= 4
         else:
             self.is_alive = False
 
-    def load_animations(self):
+    @classmethod
+    def get_animation(cls):
+        return Assets.get_animation(('Assets/moneds/MonedaD.png', 5, (16, 16), TILE_SCALE), cls.slice_animation)
+
+    @classmethod
+    def slice_animation(cls):
         tile_size = 16
         num_images = 5
 
-        spritesheet = pg.image.load('Assets/moneds/MonedaD.png')
+        spritesheet = Assets.get_image('Assets/moneds/MonedaD.png')
 
-        self.animation = []
+        animation = []
 
         for i in range(num_images):
             x = i * tile_size
@@ -1370,7 +2627,9 @@ class Coin(pg.sprite.Sprite):
             rect = pg.Rect(x, y, tile_size, tile_size)
             image = spritesheet.subsurface(rect)
             image = pg.transform.scale(image, (tile_size*TILE_SCALE, tile_size*TILE_SCALE))
-            self.animation.append(image)
+            animation.append(image)
+
+        return animation
 
 class Potion(Usable):
     def __init__(self, owner, effect=None):
@@ -1383,11 +2642,11 @@ class Potion(Usable):
         self.set_rect_and_image(self.load_image('Assets/Legacy Adventure Pack - RUINS/Assets/Bottle.png', (36, 36)))
         self.icon = self.resize_image(self.image, (ITEM_SIZE, ITEM_SIZE))
 
+    def on_attack(self):
+        self.apply_effect()
+        self.delete = True
+
     def update(self):
-        mouse_keys = pg.mouse.get_pressed()
-        if mouse_keys[0]:
-            self.apply_effect()
-            self.delete = True
         self.check_side()
 
     def apply_effect(self):
@@ -1412,17 +2671,21 @@ class Dispencer(Blueprint):
 
     def update(self):
         if self.radius.colliderect(Globals.player.rect) and self.shoot_timer.check():
-            Globals.bp_sprites.add(Fireball(self.rect.center, self.side, self.enemies))
+            Globals.bp_sprites.add(Globals.fireball_pool.acquire(self.rect.center, self.side, self.enemies))
 
 class Fireball(Blueprint):
     def __init__(self, pos, side, enemies):
         super(Fireball, self).__init__()
-        spritesheet = self.load_image('Assets/weapons/fireball_sheet.png')
 
+        self.obstacle_sprites = Globals.dispencers
+        self.spawn_timer = Timer(1000)
+
+        self.reset(pos, side, enemies)
+
+    def reset(self, pos, side, enemies):
         self.side = side
         self.enemies = enemies
-        self.obstacle_sprites = Group(Globals.platforms, Globals.dispencers)
-        self.spawn_timer = Timer(1000)
+        self.spawn_timer.update()
 
         if side == 'left':
             self.set_velocity((-4, 0))
@@ -1433,8 +2696,10 @@ class Fireball(Blueprint):
         elif side == 'down':
             self.set_velocity((0, 4))
 
-        self.animation = self.add_animation(spritesheet, 5, (35, 18), scale=1.25, new_side=side)
+        self.animation = self.load_animation('Assets/weapons/fireball_sheet.png', 5, (35, 18), scale=1.25, new_side=side)
         self.set_animation(self.animation)
+        self.current_image = 0
+        self.animation_timer.update()
 
         self.set_rect_and_image(self.animation[0], pos)
         self.rect.center = pos
@@ -1443,7 +2708,7 @@ class Fireball(Blueprint):
         self.handle_animation()
         self.move()
 
-        if self.check_group_collision(self.obstacle_sprites) and self.spawn_timer.check():
+        if (self.check_platform_collision() or self.check_group_collision(self.obstacle_sprites)) and self.spawn_timer.check():
             self.kill()
 
         for hit in self.check_group_collision(self.enemies):
@@ -1454,7 +2719,7 @@ class Fireball(Blueprint):
 class EffectPlate(Blueprint):
     def __init__(self, pos, effect, cooldown):
         super(EffectPlate, self).__init__()
-        self.animation = self.add_animation(self.load_image('Assets/Legacy Adventure Pack - RUINS/Assets/effect_plate.png'), 4, (16, 16))
+        self.animation = self.load_animation('Assets/Legacy Adventure Pack - RUINS/Assets/effect_plate.png', 4, (16, 16))
         self.set_animation(self.animation)
         self.set_rect_and_image(self.animation[0], pos)
         self.cooldown = Timer(cooldown)
@@ -1464,20 +2729,26 @@ class EffectPlate(Blueprint):
         if self.check_collision(Globals.player.rect) and self.cooldown.check():
             self.effect.renew()
             Globals.player.add_effect(self.effect)
-        self.handle_animation()
+        if self.is_visible():
+            self.handle_animation()
 
 class Bullet(Blueprint):
     def __init__(self, pos, side, enemies):
         super(Bullet, self).__init__()
 
-        self.side = side
-        self.enemies = enemies
         self.obstacle_sprites = Globals.obstacle_sprites
         self.set_rect_and_image(pg.Surface((16, 8)), pos)
-        self.set_velocity((500 if self.side == 'right' else -500, random.randint(-30, 30)))
-
         self.despawn_timer = Timer(250)
 
+        self.reset(pos, side, enemies)
+
+    def reset(self, pos, side, enemies):
+        self.side = side
+        self.enemies = enemies
+        self.rect.topleft = pos
+        self.set_velocity((500 if self.side == 'right' else -500, random.randint(-30, 30)))
+        self.despawn_timer.update()
+
     def update(self):
         self.move_advanced(self.obstacle_sprites)
         for hit in self.check_group_collision(self.enemies):
@@ -1501,179 +2772,594 @@ class Gun(Usable):
     
     def update(self):
         if isinstance(self.owner, Player):
-            mouse_keys = pg.mouse.get_pressed()
+            mouse_keys = Input.get_mouse_buttons()
             if mouse_keys[0] and self.shoot_timer.check():
-                self.add_sprite(Bullet(self.rect.center, self.side, self.enemies))
+                self.add_sprite(Globals.bullet_pool.acquire(self.rect.center, self.side, self.enemies))
                 self.shoot_sound.play()
                 #self.owner.add_knockback((-10 if self.side == 'right' else 10, -5))
         self.check_side()
 
-class Globals:
-    # BLUEPRINTS
-    bp_sprites = pg.sprite.Group()
+class MapObject:
+    def __init__(self, x, y, properties, image=None):
+        self.x = x
+        self.y = y
+        self.properties = properties
+        self.image = image
 
-    # sprite groups
-    fg_platforms = pg.sprite.Group()
-    bg_platforms = pg.sprite.Group()
-    platforms = pg.sprite.Group()
-    checkpoints = pg.sprite.Group()
-    orcs = pg.sprite.Group()
-    skeletons = pg.sprite.Group()
-    coins = pg.sprite.Group()
-    arrows = pg.sprite.Group()
-    items = pg.sprite.Group()
-    chests = pg.sprite.Group()
-    dispencers = pg.sprite.Group()
-    bosses = pg.sprite.Group()
+class MapLayer:
+    def __init__(self, name, data=None, objects=None):
+        self.name = name
+        self.data = data
+        self.objects = objects
 
-    # groups groups
-    enemies = Group(orcs, skeletons, bosses)
-    obstacle_sprites = Group(*enemies.groups, dispencers, platforms)
+    def __iter__(self):
+        if self.objects is not None:
+            return iter(self.objects)
+        ys, xs = np.nonzero(self.data)
+        return zip(xs.tolist(), ys.tolist(), self.data[ys, xs].tolist())
+
+    def get_rects(self):
+        # greedy cover of the nonzero cells with as few (x, y, w, h) tile rects as possible
+        solid = (self.data != 0).tolist()
+        height, width = self.data.shape
+        rects = []
+        for y, row in enumerate(solid):
+            x = 0
+            while x < width:
+                if not row[x]:
+                    x += 1
+                    continue
+                end = x
+                while end < width and row[end]:
+                    end += 1
+                bottom = y + 1
+                while bottom < height and all(solid[bottom][x:end]):
+                    bottom += 1
+                for i in range(y, bottom):
+                    solid[i][x:end] = [False] * (end - x)
+                rects.append((x, y, end - x, bottom - y))
+                x = end
+        return rects
+
+class CompiledMap:
+    # TMX compiled into gid arrays, a pre-scaled tile atlas and object records, see compile()
+    magic = b'PFMP'
+    version = 1
+    prefix = struct.Struct('<4sII')
+    atlas_columns = 32
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_size = self.prefix.unpack_from(self.buffer)
+        header = json.loads(self.buffer[self.prefix.size:self.prefix.size + header_size])
+        data_start = self.get_data_start(header_size)
+
+        self.width = header['width']
+        self.height = header['height']
+        self.tilewidth = header['tilewidth']
+        self.tileheight = header['tileheight']
+
+        atlas = header['atlas']
+        size = atlas['width'] * atlas['height'] * 4
+        offset = data_start + atlas['offset']
+        atlas_image = pg.image.frombuffer(self.buffer[offset:offset + size], (atlas['width'], atlas['height']), 'RGBA')
+        if pg.display.get_surface() is not None:
+            atlas_image = atlas_image.convert_alpha()
+        tile_size = atlas['tile_size']
+        self.tiles = [None] + [atlas_image.subsurface(((i % self.atlas_columns) * tile_size, (i // self.atlas_columns) * tile_size, tile_size, tile_size)) for i in range(atlas['count'])]
+
+        self.layers = []
+        for layer in header['layers']:
+            if 'objects' in layer:
+                objects = [MapObject(obj['x'], obj['y'], obj['properties'], self.tiles[obj['gid']] if obj['gid'] else None) for obj in layer['objects']]
+                self.layers.append(MapLayer(layer['name'], objects=objects))
+            else:
+                data = np.frombuffer(self.buffer, np.uint16, self.width * self.height, data_start + layer['offset']).reshape(self.height, self.width)
+                self.layers.append(MapLayer(layer['name'], data=data))
 
-    # params
-    screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    debug_image = None
+    def __iter__(self):
+        return iter(self.layers)
 
-    player = Player()
+    def close(self):
+        # the layer arrays are views into the mapping and have to go first
+        self.layers = []
+        self.buffer.close()
+        self.file.close()
 
-    # camera
-    camera_x = 0
-    camera_y = 0
+    def get_tile_image_by_gid(self, gid):
+        return self.tiles[gid]
 
-    screen_rect = pg.rect.Rect((-camera_x, -camera_y, SCREEN_WIDTH, SCREEN_HEIGHT))
+    @classmethod
+    def get_data_start(cls, header_size):
+        return (cls.prefix.size + header_size + 15) // 16 * 16
 
     @classmethod
-    def load_map(cls):
-        cls.tmx_map = pytmx.load_pygame('maps/map.tmx')
+    def get_sources(cls, tmx_path):
+        # the map, its external tilesets and every image they use
+        sources = [tmx_path]
+        tilesets = [(ET.parse(tmx_path).getroot(), os.path.dirname(tmx_path))]
+        for tileset in tilesets[0][0].iter('tileset'):
+            if 'source' in tileset.attrib:
+                path = os.path.join(tilesets[0][1], tileset.attrib['source'])
+                sources.append(path)
+                tilesets.append((ET.parse(path).getroot(), os.path.dirname(path)))
+        for root, directory in tilesets:
+            for image in root.iter('image'):
+                sources.append(os.path.join(directory, image.attrib['source']))
+        return {os.path.normpath(path): [os.stat(path).st_mtime_ns, os.stat(path).st_size] for path in sources}
 
-        cls.tile_size = cls.tmx_map.tilewidth * TILE_SCALE
-        cls.map_pixel_width = cls.tmx_map.width * cls.tile_size
-        cls.map_pixel_height = cls.tmx_map.height * cls.tile_size
+    @classmethod
+    def get_cache_path(cls, tmx_path):
+        return os.path.splitext(tmx_path)[0] + '.bin'
 
-        for layer in cls.tmx_map:
+    @classmethod
+    def is_stale(cls, tmx_path, cache_path):
+        if not os.path.exists(cache_path):
+            return True
+        with open(cache_path, 'rb') as file:
+            magic, version, header_size = cls.prefix.unpack(file.read(cls.prefix.size))
+            if magic != cls.magic or version != cls.version:
+                return True
+            header = json.loads(file.read(header_size))
+        try:
+            return header['sources'] != cls.get_sources(tmx_path)
+        except OSError:
+            return True
+
+    @classmethod
+    def load_tileset(cls, filename, colorkey=None, **kwargs):
+        # pytmx's pygame loader without its display conversion, compile runs on loader threads
+        image = pg.image.load(filename)
+        if colorkey:
+            image = image.copy()
+            image.set_colorkey(pg.Color(f'#{colorkey}'))
+
+        def load_tile(rect=None, flags=None):
+            tile = image.subsurface(rect) if rect else image.copy()
+            if flags:
+                tile = handle_transformation(tile, flags)
+            return tile
+        return load_tile
+
+    @classmethod
+    def compile(cls, tmx_path, cache_path=None):
+        cache_path = cls.get_cache_path(tmx_path) if cache_path is None else cache_path
+        tmx_map = pytmx.TiledMap(tmx_path, image_loader=cls.load_tileset)
+        tile_size = (tmx_map.tilewidth * TILE_SCALE, tmx_map.tileheight * TILE_SCALE)
+
+        # pytmx gids already include the flipped and rotated variants, they are renumbered densely for the atlas
+        gids = {}
+        tiles = []
+        def get_index(gid):
+            if gid not in gids:
+                gids[gid] = len(tiles) + 1
+                tiles.append(pg.transform.scale(tmx_map.get_tile_image_by_gid(gid), tile_size))
+            return gids[gid]
+
+        blobs = []
+        offset = 0
+        layers = []
+        for layer in tmx_map.layers:
+            if isinstance(layer, pytmx.TiledTileLayer):
+                data = np.zeros((tmx_map.height, tmx_map.width), np.uint16)
+                for x, y, gid in layer:
+                    if gid and tmx_map.get_tile_image_by_gid(gid):
+                        data[y, x] = get_index(gid)
+                layers.append({'name': layer.name, 'offset': offset})
+                blobs.append(data.tobytes())
+                offset += len(blobs[-1])
+            elif isinstance(layer, pytmx.TiledObjectGroup):
+                objects = []
+                for obj in layer:
+                    gid = get_index(obj.gid) if obj.gid and obj.image else 0
+                    objects.append({'x': obj.x, 'y': obj.y, 'gid': gid, 'properties': dict(obj.properties)})
+                layers.append({'name': layer.name, 'objects': objects})
+
+        rows = max(1, (len(tiles) + cls.atlas_columns - 1) // cls.atlas_columns)
+        atlas_image = pg.Surface((cls.atlas_columns * tile_size[0], rows * tile_size[1]), pg.SRCALPHA)
+        for i, tile in enumerate(tiles):
+            atlas_image.blit(tile, ((i % cls.atlas_columns) * tile_size[0], (i // cls.atlas_columns) * tile_size[1]))
+        atlas = {'offset': offset, 'width': atlas_image.get_width(), 'height': atlas_image.get_height(), 'tile_size': tile_size[0], 'count': len(tiles)}
+        blobs.append(pg.image.tobytes(atlas_image, 'RGBA'))
+
+        header = json.dumps({
+            'sources': cls.get_sources(tmx_path),
+            'width': tmx_map.width,
+            'height': tmx_map.height,
+            'tilewidth': tmx_map.tilewidth,
+            'tileheight': tmx_map.tileheight,
+            'atlas': atlas,
+            'layers': layers,
+        }).encode()
+        # written aside and swapped in, a crash mid-write can't leave a cache that passes is_stale
+        temp_path = os.path.splitext(cache_path)[0] + '.tmp.bin'
+        with open(temp_path, 'wb') as file:
+            file.write(cls.prefix.pack(cls.magic, cls.version, len(header)))
+            file.write(header)
+            file.write(bytes(cls.get_data_start(len(header)) - cls.prefix.size - len(header)))
+            for blob in blobs:
+                file.write(blob)
+        os.replace(temp_path, cache_path)
+        return cache_path
+
+    @classmethod
+    def prepare(cls, tmx_path):
+        cache_path = cls.get_cache_path(tmx_path)
+        if cls.is_stale(tmx_path, cache_path):
+            cls.compile(tmx_path, cache_path)
+        return cache_path
+
+    @classmethod
+    def load(cls, tmx_path):
+        return cls(cls.prepare(tmx_path))
+
+class World:
+    # state the classmethod singletons keep per world, swapped in and out by activate
+    singletons = ((Lifecycle, ('rules', 'frame_num')), (Activation, ('frame_num', 'offsets', 'counts')),
+                  (Input, ('subscribers',)), (WorldClock, ('source',)))
+
+    def __init__(self, clock=None, headless=HEADLESS):
+        self.screen = init_pygame(headless)
+        self.debug_image = None
+
+        # each world has its own clock, random state and singleton state, a new world starts from the current random state
+        self.clock = (ManualClock() if headless else RealTimeClock()) if clock is None else clock
+        self.random_state = random.getstate()
+        self.singleton_state = {Lifecycle: {'rules': {}, 'frame_num': 0},
+                                Activation: {'frame_num': 0, 'offsets': 0, 'counts': {'near': 0, 'mid': 0, 'asleep': 0}},
+                                Input: {'subscribers': {}},
+                                WorldClock: {'source': self.clock}}
+        self.activate()
+
+        # BLUEPRINTS
+        self.bp_sprites = pg.sprite.Group()
+
+        # sprite groups
+        self.fg_platforms = []
+        self.bg_platforms = []
+        self.platforms = []
+        self.colliders = []
+        self.checkpoints = pg.sprite.Group()
+        self.orcs = pg.sprite.Group()
+        self.skeletons = pg.sprite.Group()
+        self.coins = pg.sprite.Group()
+        self.coin_field = CoinField()
+        self.arrows = pg.sprite.Group()
+        self.items = ItemGroup()
+        self.chests = pg.sprite.Group()
+        self.dispencers = pg.sprite.Group()
+        self.bosses = pg.sprite.Group()
+
+        # groups groups
+        self.enemies = Group(self.orcs, self.skeletons, self.bosses)
+        self.obstacle_sprites = Group(*self.enemies.groups, self.dispencers)
+
+        # broadphase for platforms and the solid tile mask items collide with, rebuilt in load_map
+        self.platform_grid = SpatialGrid()
+        self.solid_tiles = None
+        self.tmx_map = None
+
+        # static tile layers drawn as baked chunks, moving platforms stay sprites
+        self.bg_chunks = ChunkLayer()
+        self.platform_chunks = ChunkLayer()
+        self.fg_chunks = ChunkLayer()
+        self.dynamic_platforms = pg.sprite.Group()
+
+        # projectile allocators
+        self.arrow_pool = Pool(Arrow, ARROW_POOL_CAP)
+        self.fireball_pool = Pool(Fireball, FIREBALL_POOL_CAP)
+        self.bullet_pool = Pool(Bullet, BULLET_POOL_CAP)
+
+        Lifecycle.add_rule('arrows', self.arrows, ARROW_TTL, ARROW_CAP)
+        Lifecycle.add_rule('items', self.items, ITEM_TTL, ITEM_CAP, ITEM_MERGE_RADIUS)
+
+        # camera
+        self.camera_x = 0
+        self.camera_y = 0
+
+        self.screen_rect = pg.rect.Rect((-self.camera_x, -self.camera_y, SCREEN_WIDTH, SCREEN_HEIGHT))
+
+        # culling
+        self.cull_margin = TILE_SIZE*TILE_SCALE*2
+        self.cull_rect = self.screen_rect.inflate(self.cull_margin*2, self.cull_margin*2)
+        self.drawn_count = 0
+        self.culled_count = 0
+
+        self.player = Player()
+
+    def activate(self):
+        # every Globals lookup goes to the active world
+        global Globals
+        if Globals is self:
+            return
+        if Globals is not None:
+            Globals.random_state = random.getstate()
+            for owner, names in self.singletons:
+                Globals.singleton_state[owner] = {name: getattr(owner, name) for name in names}
+        random.setstate(self.random_state)
+        for owner, names in self.singletons:
+            for name in names:
+                setattr(owner, name, self.singleton_state[owner][name])
+        Globals = self
+
+    def update_screen_rect(self):
+        self.screen_rect.topleft = (self.camera_x, self.camera_y)
+        self.cull_rect = self.screen_rect.inflate(self.cull_margin*2, self.cull_margin*2)
+
+    def get_visible(self, group):
+        visible = []
+        for sprite in group:
+            if self.cull_rect.colliderect(sprite.rect):
+                visible.append(sprite)
+            else:
+                self.culled_count += 1
+        self.drawn_count += len(visible)
+        return visible
+
+    def load_map(self):
+        if self.tmx_map is not None:
+            self.tmx_map.close()
+        self.tmx_map = CompiledMap.load(MAP_PATH)
+
+        # a reload rebuilds the tile geometry from scratch, bake_layers then refills the grid and chunks
+        self.colliders.clear()
+        self.platforms.clear()
+        self.fg_platforms.clear()
+        self.bg_platforms.clear()
+
+        self.tile_size = self.tmx_map.tilewidth * TILE_SCALE
+        self.map_pixel_width = self.tmx_map.width * self.tile_size
+        self.map_pixel_height = self.tmx_map.height * self.tile_size
+
+        for layer in self.tmx_map:
             if layer.name == 'platforms':
+                for x, y, w, h in layer.get_rects():
+                    self.colliders.append(Collider(pg.Rect(x * self.tile_size, y * self.tile_size, w * self.tile_size, h * self.tile_size)))
                 for x, y, gid in layer:
-                    tile = cls.tmx_map.get_tile_image_by_gid(gid)
+                    tile = self.tmx_map.get_tile_image_by_gid(gid)
                     if tile:
-                        platform = Platform(tile, x * cls.tmx_map.tilewidth, y * cls.tmx_map.tileheight)
-                        platform.type = 'block'
-                        cls.platforms.add(platform)
+                        self.platforms.append(Platform(tile, x * self.tmx_map.tilewidth, y * self.tmx_map.tileheight, 'block'))
             elif layer.name == 'foreground':
                 for x, y, gid in layer:
-                    tile = cls.tmx_map.get_tile_image_by_gid(gid)
+                    tile = self.tmx_map.get_tile_image_by_gid(gid)
                     if tile:
-                        platform = Platform(tile, x * cls.tmx_map.tilewidth, y * cls.tmx_map.tileheight)
-                        cls.fg_platforms.add(platform)
+                        self.fg_platforms.append(Platform(tile, x * self.tmx_map.tilewidth, y * self.tmx_map.tileheight))
             elif layer.name == 'background':
                 for x, y, gid in layer:
-                    tile = cls.tmx_map.get_tile_image_by_gid(gid)
+                    tile = self.tmx_map.get_tile_image_by_gid(gid)
                     if tile:
-                        platform = Platform(tile, x * cls.tmx_map.tilewidth, y * cls.tmx_map.tileheight)
-                        cls.bg_platforms.add(platform)
+                        self.bg_platforms.append(Platform(tile, x * self.tmx_map.tilewidth, y * self.tmx_map.tileheight))
             elif layer.name == 'spikes':
                 for x, y, gid in layer:
-                    tile = cls.tmx_map.get_tile_image_by_gid(gid)
+                    tile = self.tmx_map.get_tile_image_by_gid(gid)
                     if tile:
-                        platform = Platform(tile, x * cls.tmx_map.tilewidth, y * cls.tmx_map.tileheight)
-                        platform.type = 'spike'
-                        cls.platforms.add(platform)
+                        self.platforms.append(Platform(tile, x * self.tmx_map.tilewidth, y * self.tmx_map.tileheight, 'spike'))
             elif layer.name == 'moneds_D':
                 for x, y, gid in layer:
-                    tile = cls.tmx_map.get_tile_image_by_gid(gid)
+                    tile = self.tmx_map.get_tile_image_by_gid(gid)
                     if tile:
-                        coin = Coin((x * cls.tmx_map.tilewidth * TILE_SCALE, y * cls.tmx_map.tileheight * TILE_SCALE), 'moned_D')
-                        cls.coins.add(coin)
+                        self.coin_field.add((x * self.tmx_map.tilewidth * TILE_SCALE, y * self.tmx_map.tileheight * TILE_SCALE), 'moned_D')
             elif layer.name == 'moving':
                 for obj in layer:
-                    cls.platforms.add(PlatformMovable(obj.image, (obj.x, obj.y), obj.properties['end_pos'], obj.properties['velocity'], obj.properties['_type']))
+                    self.platforms.append(PlatformMovable(obj.image, (obj.x, obj.y), obj.properties['end_pos'], obj.properties['velocity'], obj.properties['_type']))
             elif layer.name == 'enemies':
                 for obj in layer:
-                    cls.add_enemy(obj.properties['_type'], (obj.x, obj.y), obj.properties['end_pos'], obj.properties['weapon'], obj.properties['hp'], obj.properties['damage'])
+                    self.add_enemy(obj.properties['_type'], (obj.x, obj.y), obj.properties['end_pos'], obj.properties['weapon'], obj.properties['hp'], obj.properties['damage'])
             elif layer.name == 'chests':
                 for obj in layer:
                     exec(f'chest = Chest(({obj.x, obj.y}), {obj.properties["container"]})', globals())
-                    cls.chests.add(chest)
+                    self.chests.add(chest)
             elif layer.name == 'dispencers':
                 for obj in layer:
-                    cls.dispencers.add(Dispencer((obj.x*TILE_SCALE, obj.y*TILE_SCALE), obj.properties['side'], [cls.player]))
+                    self.dispencers.add(Dispencer((obj.x*TILE_SCALE, obj.y*TILE_SCALE), obj.properties['side'], [self.player]))
             elif layer.name == 'effect_plates':
                 for obj in layer:
                     exec(f"effect = {obj.properties['effect']}", globals())
-                    cls.bp_sprites.add(EffectPlate((obj.x*TILE_SCALE, obj.y*TILE_SCALE), effect, obj.properties['cooldown']))
+                    self.bp_sprites.add(EffectPlate((obj.x*TILE_SCALE, obj.y*TILE_SCALE), effect, obj.properties['cooldown']))
             elif layer.name == 'checkpoints':
                 for x, y, gid in layer:
-                    tile = cls.tmx_map.get_tile_image_by_gid(gid)
+                    tile = self.tmx_map.get_tile_image_by_gid(gid)
                     if tile:
                         checkpoint = Checkpoint(tile, (x, y))
-                        cls.checkpoints.add(checkpoint)
+                        self.checkpoints.add(checkpoint)
 
-    @classmethod
-    def add_enemy(cls, _type, start_pos, end_pos, weapon='sword', hp=10, damage=1):
+        self.bake_layers()
+
+    def bake_layers(self):
+        self.platform_grid.clear()
+        self.bg_chunks.clear()
+        self.platform_chunks.clear()
+        self.fg_chunks.clear()
+        self.dynamic_platforms.empty()
+
+        self.solid_tiles = np.zeros((self.tmx_map.height, self.tmx_map.width), bool)
+
+        # blocks collide through the merged colliders, their tiles are only drawn
+        for collider in self.colliders:
+            self.platform_grid.add(collider)
+        for platform in self.platforms:
+            if platform.type == 'vertical' or platform.type == 'horizontal':
+                self.platform_grid.add_dynamic(platform)
+            elif platform.type == 'spike':
+                self.platform_grid.add(platform)
+            if platform.type == 'block' or platform.type == 'spike':
+                self.platform_chunks.add(platform)
+                self.solid_tiles[platform.rect.y // self.tile_size, platform.rect.x // self.tile_size] = True
+            else:
+                self.dynamic_platforms.add(platform)
+        for platform in self.bg_platforms:
+            self.bg_chunks.add(platform)
+        for platform in self.fg_platforms:
+            self.fg_chunks.add(platform)
+
+    def add_enemy(self, _type, start_pos, end_pos, weapon='sword', hp=10, damage=1):
         if _type == 'orc':
-            enemy = Orc((start_pos[0]*TILE_SCALE, start_pos[1]*TILE_SCALE), end_pos*cls.tile_size, weapon, [cls.player])
+            enemy = Orc((start_pos[0]*TILE_SCALE, start_pos[1]*TILE_SCALE), end_pos*self.tile_size, weapon, [self.player])
             enemy.hp = hp
             enemy.max_hp = hp
             enemy.weapon.damage = damage
-            cls.orcs.add(enemy)
+            self.orcs.add(enemy)
         elif _type == 'skeleton':
-            enemy = Skeleton((start_pos[0]*TILE_SCALE, start_pos[1]*TILE_SCALE), end_pos*cls.tile_size, weapon, [cls.player])
+            enemy = Skeleton((start_pos[0]*TILE_SCALE, start_pos[1]*TILE_SCALE), end_pos*self.tile_size, weapon, [self.player])
             enemy.hp = hp
             enemy.max_hp = hp
             enemy.weapon.damage = damage
-            cls.skeletons.add(enemy)
+            self.skeletons.add(enemy)
+
+# the active world, set by World.activate
+Globals = None
 
 class Game:
-    def __init__(self):
-        pg.display.set_caption("Platformer")
-        self.setup()
+    def __init__(self, headless=HEADLESS, record=None, replay=None):
+        self.startup = StartupTimer()
+        self.headless = headless
+        init_pygame(self.headless)
+        self.startup.mark('pygame')
 
-    def setup(self):
+        self.clock = pg.time.Clock()
+        self.loader = Profiler.loader = Loader()
+        for entry in Assets.manifest + Assets.rotation_manifest:
+            self.loader.add(entry[0])
+        for path in Assets.startup_manifest:
+            self.loader.add(path)
+        self.loader.add(MAP_PATH)
+        self.load()
+        self.startup.mark('load')
+
+        # the world clock starts after the loading screen, otherwise every timer built with the world fires on the first frame
+        world_clock = ManualClock() if self.headless else RealTimeClock()
+
+        # the seed covers every random call from world building on, so it is set before setup
+        if replay is not None:
+            Input.replay = InputReplay(replay)
+            random.seed(Input.replay.seed)
+            world_clock = ManualClock(Input.replay.start_ticks)
+        elif record is not None:
+            seed = random.randrange(2**64)
+            random.seed(seed)
+            Input.recorder = InputRecorder(record, seed, world_clock.get_ticks())
+
+        self.setup(world_clock)
+        self.startup.report()
+        if not self.headless:
+            self.run()
+
+    def setup(self, world_clock=None):
         self.mode = 'game'
 
-        self.clock = pg.time.Clock()
         self.is_running = False
-
-        Globals.load_map()
-
-        Globals.bosses.add(Boss(transform_pos((118, 97)), Globals.player))
-
-        self.run()
+        self.frame_num = 0
+
+        Assets.preload()
+        Assets.preload_rotations()
+        self.startup.mark('assets')
+        self.world = World(world_clock, self.headless)
+        self.startup.mark('world')
+        self.world.load_map()
+        self.startup.mark('map')
+
+        self.world.bosses.add(Boss(transform_pos((118, 97)), self.world.player))
+        self.bind_actions()
+        self.startup.mark('spawn')
+
+        # the rest of the asset folder and the other levels stream in while playing
+        self.loader.add_folder('Assets', critical=False)
+        self.loader.add_folder(os.path.dirname(MAP_PATH), critical=False)
+
+    def load(self):
+        # the window keeps responding while the workers decode, the world is built once the critical assets are in
+        while not self.loader.is_ready():
+            if self.headless:
+                self.loader.wait()
+            else:
+                for event in pg.event.get():
+                    if event.type == pg.QUIT:
+                        self.loader.stop()
+                        pg.quit()
+                        sys.exit()
+                self.draw_loading()
+                self.clock.tick(FPS)
+            self.loader.update()
+        if not self.headless:
+            self.draw_loading()
+
+    def draw_loading(self):
+        screen = pg.display.get_surface()
+        progress = self.loader.get_progress()
+        screen.fill('black')
+        bar = pg.rect.Rect(0, 0, SCREEN_WIDTH // 2, 20)
+        bar.center = (SCREEN_WIDTH/2, SCREEN_HEIGHT/2)
+        pg.draw.rect(screen, 'white', (bar.x, bar.y, bar.width * progress, bar.height))
+        pg.draw.rect(screen, 'white', bar, 2)
+        text_image, text_rect = render_text(f'ЗАГРУЗКА {progress:.0%}', 'white')
+        text_rect.midbottom = (bar.centerx, bar.top - 10)
+        screen.blit(text_image, text_rect)
+        pg.display.flip()
 
     def run(self):
+        self.world.activate()
         self.is_running = True
         while self.is_running:
             self.event()
             self.update()
             self.draw()
-            self.clock.tick(60)
+            WorldClock.advance()
+            self.frame_num += 1
+            self.clock.tick(FPS)
+        Input.stop()
+        self.loader.stop()
         pg.quit()
         quit()
 
+    def step(self, n_frames=1, inputs=None):
+        # inputs: {'keys': [pg.K_d, ...], 'mouse_buttons': (left, middle, right), 'mouse_pos': (x, y)} held for every frame,
+        # 'events': [pg.event.Event, ...] delivered on the first frame only
+        inputs = {} if inputs is None else inputs
+        self.world.activate()
+        Input.set_state(inputs.get('keys', ()), inputs.get('mouse_buttons', (False, False, False)), inputs.get('mouse_pos', (0, 0)), inputs.get('events', ()))
+        for i in range(n_frames):
+            self.event()
+            self.update()
+            if not self.headless:
+                self.draw()
+            WorldClock.advance()
+            self.frame_num += 1
+
+    def bind_actions(self):
+        Input.clear_subscribers()
+        Input.subscribe('quit', self.quit)
+        Input.subscribe('key', self.respawn)
+        Input.subscribe('inventory', self.toggle_inventory)
+        Input.subscribe('reload map', self.reload_map)
+        Input.subscribe('drop', lambda value: Globals.player.drop_item_hotbar())
+        Input.subscribe('profiler', lambda value: Profiler.toggle())
+        Input.subscribe('slot', Globals.player.select_slot)
+        Input.subscribe('slot next', lambda value: Globals.player.scroll_slot(1))
+        Input.subscribe('slot previous', lambda value: Globals.player.scroll_slot(-1))
+        Input.subscribe('attack', Globals.player.attack)
+        Input.subscribe('click', Globals.player.inventory.choose_item)
+
+    def quit(self, value=None):
+        self.is_running = False
+
+    def respawn(self, key=None):
+        if self.mode == 'game over':
+            Globals.player.respawn()
+            self.mode = 'game'
+
+    def toggle_inventory(self, value=None):
+        Globals.player.inventory.is_active = not Globals.player.inventory.is_active
+
+    def reload_map(self, value=None):
+        Assets.evict_unused()
+        Globals.load_map()
+
     def event(self):
-        for event in pg.event.get():
-            if event.type == pg.QUIT:
-                self.is_running = False
-            if event.type == pg.KEYDOWN:
-                if self.mode == 'game over':
-                    Globals.player.respawn()
-                    self.mode = 'game'
-                if event.key == pg.K_e:
-                    Globals.player.inventory.is_active = not Globals.player.inventory.is_active
-                if event.key == pg.K_m:
-                    Globals.load_map()
-                if event.key == pg.K_q:
-                    Globals.player.drop_item_hotbar()
-            if event.type == pg.MOUSEBUTTONDOWN:
-                if event.button == 5:
-                    Globals.player.active_slot += 1
-                    if Globals.player.active_slot > 8:
-                        Globals.player.active_slot = 0
-                elif event.button == 4:
-                    Globals.player.active_slot -= 1
-                    if Globals.player.active_slot < 0:
-                        Globals.player.active_slot = 8
+        Input.poll()
+        Input.dispatch()
 
-        keys = pg.key.get_pressed()
+        keys = Input.get_keys()
 
         if keys[pg.K_LEFT]:
             Globals.camera_x -= CAMERA_SPEED
@@ -1685,39 +3371,55 @@ class Game:
             Globals.camera_y += CAMERA_SPEED
 
     def update(self):
+        Profiler.begin('loader')
+        self.loader.update(LOADER_FRAME_BUDGET)
+
+        Profiler.begin('player')
         Globals.player.update()
         Globals.player.update_hotbar()
 
-        for platform in Globals.platforms:
+        Profiler.begin('platforms')
+        for platform in Globals.dynamic_platforms:
             if platform.type == 'vertical' or platform.type == 'horizontal':
                 platform.update()
+        Profiler.begin('dispencers')
         for dispencer in Globals.dispencers:
             dispencer.update()
+        Profiler.begin('checkpoints')
         for checkpoint in Globals.checkpoints:
             checkpoint.update()
+        Profiler.begin('enemies')
+        Activation.begin_frame()
         for enemy in Globals.enemies:
-            enemy.update()
+            Activation.update(enemy)
             if enemy.is_dead:
                 Globals.enemies.remove(enemy)
+        Profiler.begin('bosses')
         for boss in Globals.bosses:
-            boss.update()
+            Activation.update(boss)
+        Profiler.begin('arrows')
         for arrow in Globals.arrows:
             arrow.update()
+        Profiler.begin('coins')
+        Globals.coins.add(Globals.coin_field.collect(Globals.player.rect))
         for coin in Globals.coins:
             coin.update()
             if not coin.is_alive:
                 Globals.coins.remove(coin)
                 Globals.player.add_money(1)
+        Profiler.begin('chests')
         for chest in Globals.chests:
             chest.update()
-        for item in Globals.items:
-            item.update()
+        Profiler.begin('items')
+        Globals.items.step()
+        Profiler.begin('bp_sprites')
         for sprite in Globals.bp_sprites:
             sprite.update()
+        Profiler.begin('lifecycle')
+        Lifecycle.update()
 
-        if Globals.player.inventory.is_active:
-            Globals.player.inventory.update()
-        else:
+        Profiler.begin('inventory')
+        if not Globals.player.inventory.is_active:
             Globals.player.inventory.drop_item(Globals.player.inventory.picked_item)
             Globals.player.inventory.picked_item = None
 
@@ -1733,19 +3435,14 @@ class Game:
         elif Globals.player.last_item is not None:
             if Globals.player.last_item.item_type != current_item:
                 Globals.player.last_item.item_type.default()
-        for slot in Globals.player.inventory.slots:
-            if slot.item is not None:
-                if slot.item.item_type.amount <= 0:
-                    slot.item = None
-                    continue
-                if slot.item.item_type.delete:
-                    slot.item = None
-                    continue
 
+        Profiler.begin('camera')
         Globals.camera_x = Globals.player.rect.centerx - SCREEN_WIDTH/2
         Globals.camera_y = Globals.player.rect.centery - SCREEN_HEIGHT/2
         Globals.camera_x = max(0, min(Globals.camera_x, Globals.map_pixel_width - SCREEN_WIDTH))
         Globals.camera_y = max(0, min(Globals.camera_y, Globals.map_pixel_height - SCREEN_HEIGHT))
+        Globals.update_screen_rect()
+        Profiler.end()
 
         if Globals.player.hp <= 0:
             self.mode = 'game over'
@@ -1755,55 +3452,91 @@ class Game:
             Globals.player.get_damage(4, 500)
 
     def draw(self):
+        Profiler.begin('draw background')
         Globals.screen.fill(pg.Color('#373737'))
 
-        for platform in Globals.bg_platforms:
-            Globals.screen.blit(platform.image, platform.rect.move(-Globals.camera_x, -Globals.camera_y))
-        for chest in Globals.chests:
+        Globals.drawn_count = 0
+        Globals.culled_count = 0
+
+        Globals.bg_chunks.draw(Globals.screen_rect)
+        Profiler.begin('draw chests')
+        for chest in Globals.get_visible(Globals.chests):
             Globals.screen.blit(chest.image, chest.rect.move(-Globals.camera_x, -Globals.camera_y))
-        for coin in Globals.coins:
+        Profiler.begin('draw coins')
+        Globals.coin_field.draw(Globals.screen_rect)
+        for coin in Globals.get_visible(Globals.coins):
             Globals.screen.blit(coin.image, coin.rect.move(-Globals.camera_x, -Globals.camera_y))
-        for arrow in Globals.arrows:
+        Profiler.begin('draw arrows')
+        for arrow in Globals.get_visible(Globals.arrows):
             Globals.screen.blit(arrow.image, arrow.rect.move(-Globals.camera_x, -Globals.camera_y))
-        for platform in Globals.platforms:
+        Profiler.begin('draw platforms')
+        Globals.platform_chunks.draw(Globals.screen_rect)
+        for platform in Globals.get_visible(Globals.dynamic_platforms):
             Globals.screen.blit(platform.image, platform.rect.move(-Globals.camera_x, -Globals.camera_y))
-        for dispencer in Globals.dispencers:
+        Profiler.begin('draw dispencers')
+        for dispencer in Globals.get_visible(Globals.dispencers):
             dispencer.draw()
-        for checkpoint in Globals.checkpoints:
+        Profiler.begin('draw checkpoints')
+        for checkpoint in Globals.get_visible(Globals.checkpoints):
             Globals.screen.blit(checkpoint.image, checkpoint.rect.move(-Globals.camera_x, -Globals.camera_y))
-        for platform in Globals.fg_platforms:
-            Globals.screen.blit(platform.image, platform.rect.move(-Globals.camera_x, -Globals.camera_y))
-        for boss in Globals.bosses:
+        Profiler.begin('draw foreground')
+        Globals.fg_chunks.draw(Globals.screen_rect)
+        Profiler.begin('draw bosses')
+        for boss in Globals.get_visible(Globals.bosses):
             boss.draw()
-        for enemy in Globals.enemies:
+        Profiler.begin('draw enemies')
+        for enemy in Globals.get_visible(Globals.enemies):
             enemy.draw()
+        Profiler.begin('draw player')
         Globals.screen.blit(Globals.player.image, Globals.player.rect.move(-Globals.camera_x, -Globals.camera_y))
-        for item in Globals.items:
+        Profiler.begin('draw items')
+        for item in Globals.get_visible(Globals.items):
             Globals.screen.blit(item.image, item.rect.move(-Globals.camera_x, -Globals.camera_y))
+        Profiler.begin('draw weapon')
         if Globals.player.active_item is not None:
             Globals.player.active_item.item_type.draw()
+        Profiler.begin('draw inventory')
         if Globals.player.inventory.is_active:
             Globals.player.inventory.draw_interface()
 
-        pg.draw.rect(Globals.screen, pg.Color('black'), (95, 15, 110, 25), 3)
-        pg.draw.rect(Globals.screen, pg.Color('red'), (100, 20, Globals.player.hp/Globals.player.max_hp*100, 15))
-
+        Profiler.begin('draw hud')
+        Globals.player.draw_health(Globals.screen)
         Globals.player.draw_money(Globals.screen)
         Globals.player.draw_hotbar(Globals.screen)
 
-        for sprite in Globals.bp_sprites:
+        Profiler.begin('draw bp_sprites')
+        for sprite in Globals.get_visible(Globals.bp_sprites):
             sprite.draw()
 
         if self.mode == 'game over':
-            text = font.render('ВЫ ПРОИГРАЛИ!', True, (255, 0, 0))
+            text = Assets.get_font(FONT_SIZE).render('ВЫ ПРОИГРАЛИ!', True, (255, 0, 0))
             text_rect = text.get_rect(center=(SCREEN_WIDTH/2, SCREEN_HEIGHT/2))
             Globals.screen.blit(text, text_rect)
 
         if Globals.debug_image is not None:
             Globals.screen.blit(Globals.debug_image, (25, 50))
 
+        Profiler.end()
+        Profiler.draw()
+
+        Profiler.begin('draw flip')
         pg.display.flip()
-        clock.tick(FPS)
+        Profiler.end()
+        Profiler.end_frame()
 
 if __name__ == "__main__":
-    game = Game()
\ No newline at end of file
+    if '--compile-map' in sys.argv:
+        print(f'compiled {CompiledMap.compile(MAP_PATH)}')
+        sys.exit()
+    game = Game(record=get_arg('--record'), replay=get_arg('--replay'))
+    if game.headless:
+        start = pg.time.get_ticks()
+        if Input.replay is not None:
+            while Input.replay is not None:
+                game.step()
+        else:
+            game.step(HEADLESS_FRAMES)
+        Input.stop()
+        game.loader.stop()
+        elapsed = max(pg.time.get_ticks() - start, 1)
+        print(f'{game.frame_num} frames in {elapsed} ms ({game.frame_num * 1000 // elapsed} fps)')